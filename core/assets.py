@@ -0,0 +1,86 @@
+import logging
+import pygame
+from core.config import ROTATION_STEPS
+
+TILE_SIZE = 50
+
+# Named sprites: key -> (file, size the game draws it at)
+SPRITES = {
+    "soldier_ally": ("assets/sprites/soldiers_ally.png", (TILE_SIZE, TILE_SIZE)),
+    "soldier_enemy": ("assets/sprites/soldiers_enemy.png", (TILE_SIZE, TILE_SIZE)),
+    "obstacle": ("assets/sprites/obstacle.png", (TILE_SIZE, TILE_SIZE)),
+    "hard_obstacle": ("assets/sprites/hard_obstacle.png", (TILE_SIZE, TILE_SIZE)),
+    "flag_enemy": ("assets/sprites/flag_enemy.png", (30, 60)),
+    "flag_ally": ("assets/sprites/flag_ally.png", (30, 60)),
+}
+ROTATED_SPRITES = ("soldier_ally", "soldier_enemy")  # Pre-rotated by preload()
+
+
+class AssetManager:
+    """Loads each image once and hands out the same scaled surface to every caller.
+
+    Surfaces are cached by (file, size), converted for fast blitting once a
+    display exists, and must be treated as read-only by callers.
+    """
+
+    def __init__(self, sprites=SPRITES):
+        self.sprites = sprites
+        self.surfaces = {}  # (path, size) -> Surface
+        self.rotated = {}   # (name, steps) -> [Surface per facing]
+        self.loads = 0
+
+    def image(self, path, size=None):
+        """Surface for path scaled to size (None keeps the file's own size)."""
+        key = (path, tuple(size) if size else None)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = pygame.image.load(path)
+            self.loads += 1
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert_alpha()
+            if size:
+                surface = pygame.transform.scale(surface, size)
+            self.surfaces[key] = surface
+        return surface
+
+    def get(self, name):
+        """Surface of a named sprite from SPRITES."""
+        path, size = self.sprites[name]
+        return self.image(path, size)
+
+    def rotations(self, name, steps=ROTATION_STEPS):
+        """Named sprite pre-rotated to steps evenly spaced angles; entry i is i * 360 / steps degrees."""
+        key = (name, steps)
+        frames = self.rotated.get(key)
+        if frames is None:
+            base = self.get(name)
+            frames = [pygame.transform.rotate(base, i * 360 / steps) for i in range(steps)]
+            self.rotated[key] = frames
+        return frames
+
+    def preload(self, names=None):
+        """Load (and pre-rotate) named sprites up front so the first frames do no disk I/O."""
+        for name in names or self.sprites:
+            try:
+                self.get(name)
+                if name in ROTATED_SPRITES:
+                    self.rotations(name)
+            except (pygame.error, FileNotFoundError) as e:
+                logging.error(f"Error loading sprite {name}: {e}")
+
+    def memory_usage(self):
+        """Bytes of pixel data held by cached surfaces."""
+        surfaces = list(self.surfaces.values())
+        for frames in self.rotated.values():
+            surfaces.extend(frames)
+        return sum(surface.get_pitch() * surface.get_height() for surface in surfaces)
+
+    def stats(self):
+        return {"surfaces": len(self.surfaces), "loads": self.loads, "bytes": self.memory_usage()}
+
+    def clear(self):
+        self.surfaces.clear()
+        self.rotated.clear()
+
+
+assets = AssetManager()
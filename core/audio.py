@@ -0,0 +1,27 @@
+import logging
+import pygame
+
+
+class SoundEffects:
+    """Simulation observer that plays the battle's sound effects."""
+
+    def __init__(self):
+        # Initialize the mixer if it's not already initialized
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+
+        # Load sounds safely
+        self.fire_sound = self.load_sound("assets/sounds/shot.mp3")
+        self.hit_sound = self.load_sound("assets/sounds/hit.mp3")
+
+    def load_sound(self, file_path):
+        """ Load a sound file safely. If it fails, return None. """
+        try:
+            return pygame.mixer.Sound(file_path)
+        except Exception as e:
+            logging.error(f"Error loading sound {file_path}: {e}")
+            return None
+
+    def on_shot(self, attacker, target):
+        if self.fire_sound:
+            self.fire_sound.play()
@@ -1,3 +1,6 @@
+import pygame
+
+
 class Camera:
     def __init__(self, screen_width, screen_height, map_width, map_height, tile_size):
         self.x = 0
@@ -17,3 +20,8 @@ class Camera:
     def apply(self, position):
         """Offset a position by the camera's current position."""
         return position[0] - self.x, position[1] - self.y
+
+    def view_rect(self, margin=0):
+        """World rect currently on screen, grown by margin on every side."""
+        return pygame.Rect(self.x - margin, self.y - margin,
+                           self.screen_width + 2 * margin, self.screen_height + 2 * margin)
@@ -3,8 +3,48 @@ SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 
 # Game settings
-FPS = 60
-UNIT_SPEED = 5
+FPS = 60  # Display frame cap
+SIM_RATE = 60  # Simulation ticks per second; gameplay speeds and times are per second and converted below
+MAX_CATCH_UP_TICKS = 5  # Most ticks run in one frame before the simulation is let fall behind
+UNIT_SPEED = 120  # Default unit speed in pixels per second
+UNIT_SEARCH_INTERVAL = 0.5  # Seconds between an idle unit's looks for the nearest enemy
+
+
+def per_tick(per_second):
+    """A per-second amount (pixels/s, ...) as the amount per simulation tick."""
+    return per_second / SIM_RATE
+
+
+def ticks(seconds):
+    """A duration as a whole number of simulation ticks, at least one."""
+    return max(1, round(seconds * SIM_RATE))
+
+
+# Pathfinding
+PATH_CLUSTER_SIZE = 16  # Tiles per HPA* cluster side; longer orders use the abstract graph
+FLOW_FIELD_REGION_SIZE = 4  # Pursuit goals within the same region share one flow field
+PATH_STRATEGY = "astar"  # Grid search for short orders: "astar" or "jps" (Jump Point Search)
+PATH_CACHE_SIZE = 512  # Short paths kept for reuse, least recently used dropped first
+PATH_BUDGET_EXPANSIONS = 1024  # Search work per simulation tick; a fixed count keeps replays exact
+PATH_WORKERS = 0  # Worker processes for pathfinding; 0 keeps every search on the main thread
+
+# Spatial queries
+SPATIAL_CELL_SIZE = 100  # World pixels per spatial hash cell
+
+# Rendering
+ROTATION_STEPS = 32  # Pre-rendered facings per unit sprite
+STATIC_CHUNK_TILES = 8  # Tiles per side of each pre-baked ground/obstacle chunk
+ATLAS_SIZE = 1024  # Side in pixels of the texture atlas that unit, weapon and flag sprites are drawn from
+CULL_MARGIN = 64  # Pixels around the screen still drawn, covers sprites larger than their rect
+TEXT_CACHE_SIZE = 256  # Rendered text surfaces kept, least recently used dropped first
+DIRTY_RECTS = False  # Redraw and present only the screen areas that changed since the last frame
+
+# Replays and snapshots
+REPLAY_DIR = "replays"  # Where finished battles are saved; None turns recording off
+SAVE_FILE = "saves/quicksave.bsnap"  # Snapshot written by F5 and read back by F9
+CHECKPOINT_INTERVAL_TICKS = SIM_RATE  # In-memory snapshot taken once a second for rewinding
+CHECKPOINTS_KEPT = 60  # Oldest checkpoints are dropped beyond this
+REWIND_TICKS = 5 * SIM_RATE  # How far back Backspace rewinds
 
 # Colors (RGB values)
 COLORS = {
@@ -15,6 +55,7 @@ COLORS = {
     "blue": (0, 0, 255),
     "gray": (128, 128, 128),
     "brown": (139, 69, 19),  # Good for terrain or obstacles
+    "cyan": (0, 255, 255),  # Selected units
 }
 
 # Map layers
@@ -0,0 +1,199 @@
+from array import array
+from collections import OrderedDict, deque
+import numpy as np
+from core.grid import STATIC_BLOCKED
+
+UNREACHED = 0x7FFFFFFF
+NEIGHBORS = (
+    (1, 0), (-1, 0), (0, 1), (0, -1),
+    (1, 1), (-1, 1), (1, -1), (-1, -1)
+)
+
+
+_neighbor_tables = {}
+
+
+def _neighbor_table(width, height):
+    """(width * height, 8) indices of each tile's NEIGHBORS, -1 off the map."""
+    table = _neighbor_tables.get((width, height))
+    if table is None:
+        x, y = np.meshgrid(np.arange(width), np.arange(height))
+        x, y = x.ravel(), y.ravel()
+        table = np.full((width * height, len(NEIGHBORS)), -1, dtype=np.int32)
+        for i, (dx, dy) in enumerate(NEIGHBORS):
+            nx, ny = x + dx, y + dy
+            inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+            table[inside, i] = (ny * width + nx)[inside]
+        table = _neighbor_tables[(width, height)] = table
+    return table
+
+
+class FlowField:
+    """Integration field: steps from every tile to a goal region.
+
+    The field covers static terrain only, so it stays valid while units move;
+    units step around each other when they read it. Terrain changes are
+    patched in place with repair() instead of re-flooding the whole map.
+    """
+
+    def __init__(self, grid, goal_tiles):
+        self.grid = grid
+        self.goal_tiles = goal_tiles
+        self.distances = array("i", [UNREACHED]) * (grid.width * grid.height)
+        seeds = []
+        for x, y in goal_tiles:
+            index = y * grid.width + x
+            self.distances[index] = 0
+            seeds.append(index)
+        self._flood(seeds)
+
+    def _neighbors(self, index):
+        width = self.grid.width
+        x, y = index % width, index // width
+        for dx, dy in NEIGHBORS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < self.grid.height:
+                yield ny * width + nx
+
+    def _flood(self, seeds):
+        """Relax distances outwards from seeds (uniform cost, 8-connected), a whole wavefront per pass."""
+        grid = self.grid
+        neighbors = _neighbor_table(grid.width, grid.height)
+        distances = np.frombuffer(self.distances, dtype=np.intc)
+        open_tiles = np.frombuffer(grid.cells, dtype=np.uint8) & STATIC_BLOCKED == 0
+        changed = np.zeros(len(distances), dtype=bool)
+        changed[list(seeds)] = True
+        frontier = np.flatnonzero(changed)
+        while len(frontier):
+            reached = neighbors[frontier].ravel()
+            steps = np.repeat(distances[frontier] + 1, len(NEIGHBORS))
+            inside = reached >= 0
+            reached, steps = reached[inside], steps[inside]
+            better = open_tiles[reached] & (steps < distances[reached])
+            reached = reached[better]
+            np.minimum.at(distances, reached, steps[better])
+            changed[:] = False
+            changed[reached] = True
+            frontier = np.flatnonzero(changed)
+
+    def distance(self, tile):
+        if not self.grid.in_bounds(tile):
+            return UNREACHED
+        return self.distances[tile[1] * self.grid.width + tile[0]]
+
+    def repair(self, tile):
+        """Patch the field after static terrain on tile changed."""
+        if not self.grid.in_bounds(tile):
+            return
+        width = self.grid.width
+        distances = self.distances
+        index = tile[1] * width + tile[0]
+
+        if self.grid.cells[index] & STATIC_BLOCKED:
+            if distances[index] == UNREACHED:
+                return
+            # Clear every tile whose only downhill neighbours were cleared, in distance order
+            cleared = [index]
+            queue = deque([(index, distances[index])])
+            distances[index] = UNREACHED
+            while queue:
+                current, old = queue.popleft()
+                for neighbor in self._neighbors(current):
+                    if distances[neighbor] != old + 1:
+                        continue
+                    if any(distances[other] == old for other in self._neighbors(neighbor)):
+                        continue
+                    distances[neighbor] = UNREACHED
+                    cleared.append(neighbor)
+                    queue.append((neighbor, old + 1))
+            seeds = {neighbor for current in cleared for neighbor in self._neighbors(current)
+                     if distances[neighbor] != UNREACHED}
+            self._flood(seeds)
+        else:
+            if index in (y * width + x for x, y in self.goal_tiles):
+                distances[index] = 0
+            else:
+                best = min(distances[neighbor] for neighbor in self._neighbors(index))
+                if best == UNREACHED:
+                    return
+                distances[index] = best + 1
+            self._flood([index])
+
+    def path_from(self, position, max_steps=4):
+        """Waypoints (tile centers) following the field downhill from position."""
+        grid = self.grid
+        tile = grid.tile_at(position)
+        path = []
+        for _ in range(max_steps):
+            current = self.distance(tile)
+            if current in (0, UNREACHED):
+                break
+            best = None
+            for dx, dy in NEIGHBORS:
+                neighbor = (tile[0] + dx, tile[1] + dy)
+                distance = self.distance(neighbor)
+                if distance >= current:
+                    continue
+                # Prefer free tiles so units sharing a field flow around each other
+                key = (not grid.is_walkable(neighbor), distance)
+                if best is None or key < best[0]:
+                    best = (key, neighbor)
+            if best is None:
+                break
+            tile = best[1]
+            path.append(grid.tile_center(tile))
+        return path
+
+
+class FlowFieldService:
+    """Shares one FlowField per goal region between every unit heading there.
+
+    Goals are bucketed into square regions of region_size tiles, so units
+    chasing nearby enemies reuse the same field. The least recently used
+    fields are dropped once more than max_fields are alive.
+    """
+
+    def __init__(self, grid, region_size=4, max_fields=32):
+        self.grid = grid
+        self.region_size = region_size
+        self.max_fields = max_fields
+        self.fields = OrderedDict()
+
+    def region_of(self, position):
+        tile = self.grid.tile_at(position)
+        return tile[0] // self.region_size, tile[1] // self.region_size
+
+    def get_field(self, goal_position):
+        """Return the shared field for the region containing goal_position."""
+        region = self.region_of(goal_position)
+        field = self.fields.get(region)
+        if field is not None:
+            self.fields.move_to_end(region)
+            return field
+
+        size = self.region_size
+        goal_tiles = [
+            (x, y)
+            for y in range(region[1] * size, (region[1] + 1) * size)
+            for x in range(region[0] * size, (region[0] + 1) * size)
+            if self.grid.is_passable((x, y))
+        ]
+        if not goal_tiles:
+            goal_tiles = [self.grid.tile_at(goal_position)]
+            if not self.grid.in_bounds(goal_tiles[0]):
+                return None
+        field = FlowField(self.grid, goal_tiles)
+        self.fields[region] = field
+        if len(self.fields) > self.max_fields:
+            self.fields.popitem(last=False)
+        return field
+
+    def path_towards(self, start, goal_position, max_steps=4):
+        """Next few waypoints from start towards goal_position's region."""
+        field = self.get_field(goal_position)
+        return field.path_from(start, max_steps) if field else []
+
+    def terrain_changed(self, tile):
+        """Repair every live field after static terrain on tile changed."""
+        for field in self.fields.values():
+            field.repair(tile)
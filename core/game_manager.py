@@ -1,29 +1,31 @@
 import pygame
 import logging
-from core.config import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, COLORS
+from core.config import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, COLORS, PATH_WORKERS, DIRTY_RECTS, REPLAY_DIR
+from core.config import SAVE_FILE, CHECKPOINT_INTERVAL_TICKS, CHECKPOINTS_KEPT, REWIND_TICKS
 from rendering.renderer import Renderer
-from mechanics.map_manager import MapManager
+from rendering.dirty_rects import DirtyRects
+from rendering.text_cache import text_cache
 from core.camera import Camera
-from core import utils
-from mechanics.combat_manager import CombatManager
+from core.assets import assets
+from core.audio import SoundEffects
+from core.simulation import Simulation
+from core.replay import save_replay
+from core import snapshot
+from core.timestep import FixedTimestep
 import random
 
-class Player:
-    def __init__(self):
-        self.score = 0
-
 class Button:
-    def __init__(self, rect, text, callback, font, text_color, button_color):
+    def __init__(self, rect, text, callback, font_size, text_color, button_color):
         self.rect = pygame.Rect(rect)
         self.text = text
         self.callback = callback
-        self.font = font
+        self.font_size = font_size
         self.text_color = text_color
         self.button_color = button_color
 
     def draw(self, surface):
         pygame.draw.rect(surface, self.button_color, self.rect)
-        text_surface = self.font.render(self.text, True, self.text_color)
+        text_surface = text_cache.render(self.text, self.font_size, self.text_color)
         text_rect = text_surface.get_rect(center=self.rect.center)
         surface.blit(text_surface, text_rect)
 
@@ -47,7 +49,12 @@ class GameManager:
         self.state = "MENU"
         self.difficulty_modifier = 1.0  # Default difficulty
 
-        self.menu_font = pygame.font.Font(None, 36)
+        self.menu_font_size = 36
+        self.cursor_font_size = 24
+        self.dirty_rects = DirtyRects()
+        self.presented_state = None  # State whose screen is currently shown
+        self.timestep = FixedTimestep()
+        self.frame_seconds = 0.0
         button_width = 200
         button_height = 50
         start_button_rect = pygame.Rect(
@@ -63,50 +70,90 @@ class GameManager:
             (button_width, button_height)
         )
         self.menu_buttons = [
-            Button(start_button_rect, "Start", self.show_difficulty_selection, self.menu_font, COLORS["black"], COLORS["white"]),
-            Button(exit_button_rect, "Exit", self.exit_game, self.menu_font, COLORS["black"], COLORS["white"])
+            Button(start_button_rect, "Start", self.show_difficulty_selection, self.menu_font_size, COLORS["black"], COLORS["white"]),
+            Button(exit_button_rect, "Exit", self.exit_game, self.menu_font_size, COLORS["black"], COLORS["white"])
         ]
 
         self.difficulty_buttons = [
-            Button((SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 - 60, 200, 50), "Easy", lambda: self.set_difficulty(0.5), self.menu_font, COLORS["black"], COLORS["white"]),
-            Button((SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2, 200, 50), "Normal", lambda: self.set_difficulty(1.0), self.menu_font, COLORS["black"], COLORS["white"]),
-            Button((SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 + 60, 200, 50), "Hard", lambda: self.set_difficulty(2.0), self.menu_font, COLORS["black"], COLORS["white"])
+            Button((SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 - 60, 200, 50), "Easy", lambda: self.set_difficulty(0.5), self.menu_font_size, COLORS["black"], COLORS["white"]),
+            Button((SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2, 200, 50), "Normal", lambda: self.set_difficulty(1.0), self.menu_font_size, COLORS["black"], COLORS["white"]),
+            Button((SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 + 60, 200, 50), "Hard", lambda: self.set_difficulty(2.0), self.menu_font_size, COLORS["black"], COLORS["white"])
         ]
         self.game_over_buttons = [
-            Button(restart_button_rect, "Restart", self.restart_game, self.menu_font, COLORS["black"], COLORS["white"]),
-            Button(exit_button_rect, "Exit", self.exit_game, self.menu_font, COLORS["black"], COLORS["white"])
+            Button(restart_button_rect, "Restart", self.restart_game, self.menu_font_size, COLORS["black"], COLORS["white"]),
+            Button(exit_button_rect, "Exit", self.exit_game, self.menu_font_size, COLORS["black"], COLORS["white"])
         ]
 
+        assets.preload()
+
         self.tile_size = 50
         self.dragging = False
-
-        self.map_manager = MapManager("assets/maps/test_map.txt", self.tile_size)
-        self.map_manager.load_map()
+        self.selected_units = []
+        self.replay_saved = False
+
+        self.simulation = Simulation("assets/maps/test_map.txt", self.tile_size, path_workers=PATH_WORKERS)
+        self.sound_effects = SoundEffects()
+        self.simulation.add_observer(self.sound_effects)
+        self.simulation.add_observer(self)
+        self.map_manager = self.simulation.map_manager
+        # Restart, rewind and quickload restore snapshots instead of rebuilding anything
+        self.start_snapshot = snapshot.capture(self.simulation)
+        self.checkpoints = snapshot.Checkpoints(CHECKPOINT_INTERVAL_TICKS, CHECKPOINTS_KEPT)
         map_width, map_height = self.map_manager.get_map_dimensions()
 
         self.real_map_width = map_width * self.tile_size
         self.real_map_height = map_height * self.tile_size
 
         self.camera = Camera(SCREEN_WIDTH, SCREEN_HEIGHT, self.real_map_width, self.real_map_height, self.tile_size)
-        self.renderer = Renderer(self.screen, self.tile_size, self.camera)
-
-        self.teams = self.map_manager.get_teams()
-        self.units = self.map_manager.get_units()
-        self.obstacles = self.map_manager.get_obstacles()
-        self.hard_obstacles = []  # Initialize hard obstacles list
-        self.flags = self.map_manager.get_flags()  # Get flags from map manager
-
-        self.combat_manager = CombatManager()
-        self.player = Player()
+        self.renderer = Renderer(self.screen, self.tile_size, self.camera, self.simulation.spatial_index)
+        logging.info(f"Assets loaded: {assets.stats()}")
 
         self.menu_music = pygame.mixer.Sound("assets/music/main_menu_music_1.mp3")
         self.combat_music = pygame.mixer.Sound("assets/music/combat.mp3")
         self.play_menu_music()
-
-        self.player = Player()  # Initialize player with score
-        self.flags = self.map_manager.get_flags()  # Get flags from map manager
         print(f"Flags loaded: {self.flags}")  # Debugging print statement
 
+    # The battle itself lives in self.simulation; these read through to it
+    @property
+    def units(self):
+        return self.simulation.units
+
+    @property
+    def obstacles(self):
+        return self.simulation.obstacles
+
+    @property
+    def hard_obstacles(self):
+        return self.simulation.hard_obstacles
+
+    @property
+    def tile_map(self):
+        return self.simulation.tile_map
+
+    @property
+    def flags(self):
+        return self.simulation.flags
+
+    @property
+    def teams(self):
+        return self.simulation.teams
+
+    @property
+    def player(self):
+        return self.simulation.player
+
+    @property
+    def spatial_index(self):
+        return self.simulation.spatial_index
+
+    @property
+    def path_queue(self):
+        return self.simulation.path_queue
+
+    @property
+    def combat_manager(self):
+        return self.simulation.combat_manager
+
     def play_menu_music(self):
         """Play the menu music."""
         menu_music_files = ["assets/music/main_menu_music_1.mp3", "assets/music/main_menu_music_2.mp3"]
@@ -128,9 +175,85 @@ class GameManager:
     def restart_game(self):
         """Callback for the Restart button; restart the game."""
         print("Restarting game...")
-        self.__init__()
+        self.save_replay()
+        snapshot.restore(self.simulation, self.start_snapshot)
+        self.checkpoints.clear()
+        self.replay_saved = False
+        self.after_restore()
         self.start_game()
 
+    def after_restore(self):
+        """Bring the UI back in line with a simulation that was just restored."""
+        self.dragging = False
+        self.selected_units = [unit for unit in self.units if unit.selected]
+        self.state = self.simulation.state
+        self.dirty_rects.invalidate()
+        self.timestep.reset()
+
+    def rewind(self):
+        tick = self.simulation.tick
+        restored = self.checkpoints.rewind(self.simulation, REWIND_TICKS)
+        if restored is not None:
+            logging.info(f"Rewound from tick {tick} to {restored}")
+            self.replay_saved = False
+            self.after_restore()
+
+    def quicksave(self):
+        try:
+            snapshot.save(SAVE_FILE, snapshot.capture(self.simulation))
+        except OSError as e:
+            logging.error(f"Could not save to {SAVE_FILE}: {e}")
+            return
+        logging.info(f"Saved tick {self.simulation.tick} to {SAVE_FILE}")
+
+    def quickload(self):
+        try:
+            data = snapshot.load(SAVE_FILE)
+            header, _ = snapshot.read(data)
+            if header["seed"] != self.simulation.seed or header["map"] != self.simulation.map_file:
+                # A different battle: its units and weapons come from its own map and seed
+                simulation = Simulation(header["map"], header["tile_size"], difficulty=header["start_difficulty"],
+                                        seed=header["seed"], path_workers=PATH_WORKERS)
+                try:
+                    start_snapshot = snapshot.capture(simulation)
+                    snapshot.restore(simulation, data)
+                except ValueError:
+                    simulation.close()  # Never swapped in, so nothing else would stop its workers
+                    raise
+                self.save_replay()  # The outgoing battle's replay, before it is gone
+                self.use_simulation(simulation, start_snapshot)
+            else:
+                snapshot.restore(self.simulation, data)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not load {SAVE_FILE}: {e}")
+            return
+        logging.info(f"Loaded tick {self.simulation.tick} from {SAVE_FILE}")
+        self.checkpoints.clear()
+        self.replay_saved = False
+        self.after_restore()
+
+    def use_simulation(self, simulation, start_snapshot):
+        """Swap in another battle, keeping the window, assets and sound."""
+        self.simulation.close()
+        self.simulation = simulation
+        self.simulation.add_observer(self.sound_effects)
+        self.simulation.add_observer(self)
+        self.map_manager = simulation.map_manager
+        self.start_snapshot = start_snapshot
+        self.renderer.spatial_index = simulation.spatial_index
+        self.renderer.build_static_layer(self.tile_map, COLORS)
+
+        map_width, map_height = self.map_manager.get_map_dimensions()
+        self.real_map_width = map_width * simulation.tile_size
+        self.real_map_height = map_height * simulation.tile_size
+        self.camera.map_width = self.real_map_width
+        self.camera.map_height = self.real_map_height
+        self.camera.move(0, 0)  # Pull the view back inside a smaller map
+
+    def on_terrain_changed(self, tile_map, rect):
+        self.renderer.terrain_changed(tile_map, rect)
+        self.dirty_rects.invalidate()
+
     def exit_game(self):
         """Callback for the Exit button; quit the game."""
         print("Exiting game...")
@@ -149,6 +272,10 @@ class GameManager:
         for event in events:
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_BACKSPACE:
+                self.rewind()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F9:
+                self.quickload()
             for button in self.game_over_buttons:
                 button.handle_event(event)
 
@@ -163,6 +290,12 @@ class GameManager:
                 if event.key == pygame.K_ESCAPE:
                     self.state = "MENU"
                     self.play_menu_music()
+                elif event.key == pygame.K_BACKSPACE:
+                    self.rewind()
+                elif event.key == pygame.K_F5:
+                    self.quicksave()
+                elif event.key == pygame.K_F9:
+                    self.quickload()
 
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
@@ -174,36 +307,22 @@ class GameManager:
                 if event.button == 1 and self.dragging:
                     self.dragging = False
                     adjusted_rect = self.selection_rect.move(self.camera.x, self.camera.y)
-                    selected_any = False
-                    for unit in self.units:
-                        if adjusted_rect.colliderect(unit.rect):
-                            unit.select(True)
-                            selected_any = True
-                            logging.debug(f"Selected unit at {unit.rect.topleft}")
-                            break
-                        else:
-                            unit.select(False)
-                    if not selected_any:
+                    adjusted_rect.normalize()
+                    selected = self.spatial_index.units.query_rect(adjusted_rect)
+                    # Orders go through the simulation so they land in the replay
+                    self.simulation.order("select", selected)
+                    self.selected_units = selected
+                    for unit in selected:
+                        logging.debug(f"Selected unit at {unit.rect.topleft}")
+                    if not selected:
                         logging.debug("No unit selected.")
 
                 elif event.button == 3:
                     world_pos = (mouse_pos[0] + self.camera.x, mouse_pos[1] + self.camera.y)
-                    for unit in self.units:
-                        if unit.selected:
-                            if unit.path and unit.path[-1] == world_pos:
-                                continue
-                            path = utils.astar_pathfinding(
-                                start=unit.rect.center,
-                                end=world_pos,
-                                obstacles=self.obstacles,
-                                hard_obstacles=self.hard_obstacles,
-                                tile_size=self.tile_size,
-                                map_width=self.real_map_width,
-                                map_height=self.real_map_height,
-                                units=self.units
-                            )
-                            unit.set_path(path)
-                            logging.debug(f"Path for unit at {unit.rect.topleft}: {path}")
+                    self.selected_units = [unit for unit in self.selected_units if unit.health > 0]
+                    if self.selected_units:
+                        self.simulation.order("move", self.selected_units, world_pos)
+                        logging.debug(f"Move ordered for {len(self.selected_units)} units to {world_pos}")
 
             elif event.type == pygame.MOUSEMOTION:
                 if self.dragging:
@@ -223,23 +342,16 @@ class GameManager:
     
     def update_game(self):
             """Update game logic (combat, unit removal, flag capture, etc.)"""
-            self.combat_manager.handle_combat(self.units, self.obstacles, self.hard_obstacles)
-            self.units = [u for u in self.units if u.health > 0]
+            self.simulation.step()
+            self.checkpoints.record(self.simulation)
+            if self.simulation.state != "GAME":
+                self.state = self.simulation.state
+                self.save_replay()
 
-            # Check for flag captures
-            for flag in self.flags:
-                if not flag.is_captured():
-                    for unit in self.units:
-                        if unit.team.name == "Allies" and flag.rect.colliderect(unit.rect):
-                            flag.capture(unit.team, self.player)
-                            
-            # Check for win condition
-            if all(flag.is_captured() for flag in self.flags):
-                self.state = "WIN"
-
-            # Check for lose condition
-            if not any(unit.team.name == "Allies" for unit in self.units):
-                self.state = "GAME_OVER"
+    def save_replay(self):
+        """Save the battle so far as a replay, once, if recording is on and it has started."""
+        if REPLAY_DIR and self.simulation.tick and not self.replay_saved:
+            self.replay_saved = save_replay(self.simulation, REPLAY_DIR) is not None
 
 
     def play_menu_music(self):
@@ -260,15 +372,8 @@ class GameManager:
     def start_game(self):
         self.state = "GAME"
         self.play_combat_music()
-        self.teams = self.map_manager.get_teams()
-        self.units = self.map_manager.get_units()
-        self.obstacles = self.map_manager.get_obstacles()
-        self.hard_obstacles = self.map_manager.get_hard_obstacles()
-        self.flags = self.map_manager.get_flags()
-        
-        for unit in self.units:
-            unit.set_difficulty_multiplier(self.difficulty_modifier)
-        self.combat_manager.set_difficulty_multiplier(self.difficulty_modifier)
+        self.renderer.build_static_layer(self.tile_map, COLORS)
+        self.simulation.order("difficulty", [], self.difficulty_modifier)
 
     def exit_game(self):
         self.running = False
@@ -300,29 +405,52 @@ class GameManager:
         pygame.display.flip()
 
     def render_game(self):
-        """Render the gameplay screen."""
+        """Render the gameplay screen, patching only changed areas in dirty-rect mode."""
+        mouse_pos = pygame.mouse.get_pos()
+        if DIRTY_RECTS:
+            rects = self.dirty_rects.frame(self.camera, self.scene_rects(mouse_pos))
+            if rects is not None:
+                for rect in rects:
+                    self.draw_scene(mouse_pos, rect)
+                pygame.display.update(rects)
+                return
+
+        self.draw_scene(mouse_pos)
+        logging.debug(f"Drawn/culled this frame: {self.renderer.stats}")
+        pygame.display.flip()
+
+    def scene_rects(self, mouse_pos):
+        """Screen rects of everything draw_scene draws, for dirty-rect tracking."""
+        rects = self.renderer.scene_rects(self.units, self.combat_manager, self.flags)
+        text = f"{mouse_pos}"
+        rects["cursor"] = (pygame.Rect((mouse_pos[0] + 10, mouse_pos[1] + 10), text_cache.size(text, self.cursor_font_size)), text)
+        if self.dragging:
+            selection = self.selection_rect.copy()
+            selection.normalize()
+            rects["selection"] = (selection.inflate(2, 2), None)
+        return rects
+
+    def draw_scene(self, mouse_pos, area=None):
+        """Draw the game world and overlays, clipped to a screen area if one is given."""
+        self.screen.set_clip(area)
+        world_area = area.move(self.camera.x, self.camera.y) if area else None
         self.screen.fill(COLORS["black"])
-        self.renderer.render_ground(SCREEN_WIDTH, SCREEN_HEIGHT, COLORS)
-        self.renderer.render_map(self.obstacles, self.hard_obstacles, COLORS)
-        self.renderer.render_units(self.units, COLORS)
-        self.renderer.render_bullets(self.combat_manager)
-        self.renderer.render_flags(self.flags)
+        self.renderer.render_map(self.tile_map, COLORS)
+        self.renderer.render_units(self.units, COLORS, world_area)
+        self.renderer.render_bullets(self.combat_manager, world_area)
+        self.renderer.render_flags(self.flags, world_area)
 
-        mouse_pos = pygame.mouse.get_pos()
-        font = pygame.font.Font(None, 24)
-        text_surface = font.render(f"{mouse_pos}", True, COLORS["white"])
+        text_surface = text_cache.render(f"{mouse_pos}", self.cursor_font_size, COLORS["white"])
         self.screen.blit(text_surface, (mouse_pos[0] + 10, mouse_pos[1] + 10))
 
         if self.dragging:
             pygame.draw.rect(self.screen, COLORS["white"], self.selection_rect, 1)
-
-        pygame.display.flip()
+        self.screen.set_clip(None)
 
     def render_game_over(self):
         """Render the game over screen."""
         self.screen.fill(COLORS["black"])
-        font = pygame.font.Font(None, 72)
-        text_surface = font.render("GAME OVER", True, COLORS["red"])
+        text_surface = text_cache.render("GAME OVER", 72, COLORS["red"])
         text_rect = text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
         self.screen.blit(text_surface, text_rect)
         for button in self.game_over_buttons:
@@ -332,8 +460,7 @@ class GameManager:
     def render_win(self):
         """Render the win screen."""
         self.screen.fill(COLORS["black"])
-        font = pygame.font.Font(None, 72)
-        text_surface = font.render("YOU WIN", True, COLORS["green"])
+        text_surface = text_cache.render("YOU WIN", 72, COLORS["green"])
         text_rect = text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
         self.screen.blit(text_surface, text_rect)
         for button in self.game_over_buttons:
@@ -354,25 +481,43 @@ class GameManager:
                 if event.type == pygame.QUIT:
                     self.running = False
 
+            # Menus never change while shown, so in dirty-rect mode they are drawn once
+            redraw = not DIRTY_RECTS or self.state != self.presented_state
+            if self.state != self.presented_state:
+                self.dirty_rects.invalidate()
+                self.timestep.reset()
+            self.presented_state = self.state
+
             if self.state == "MENU":
                 self.handle_menu_events(events)
-                self.render_menu()
+                if redraw:
+                    self.render_menu()
             elif self.state == "DIFFICULTY_SELECTION":
                 self.handle_difficulty_events(events)
-                self.render_difficulty_selection()
+                if redraw:
+                    self.render_difficulty_selection()
             elif self.state == "GAME":
                 self.handle_game_events(events)
-                self.update_game()
+                # The battle advances at SIM_RATE whatever the frame rate; drawing interpolates in between
+                for _ in range(self.timestep.advance(self.frame_seconds)):
+                    self.update_game()
+                    if self.state != "GAME":
+                        break
+                self.renderer.alpha = self.timestep.alpha
                 self.render_game()
             elif self.state == "GAME_OVER":
                 self.handle_game_over_events(events)
-                self.render_game_over()
+                if redraw:
+                    self.render_game_over()
             elif self.state == "WIN":
                 self.handle_game_over_events(events)
-                self.render_win()
+                if redraw:
+                    self.render_win()
 
-            self.clock.tick(FPS)
+            self.frame_seconds = self.clock.tick(FPS) / 1000
 
+        self.save_replay()
+        self.simulation.close()
         pygame.quit()
 
 if __name__ == "__main__":
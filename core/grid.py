@@ -0,0 +1,109 @@
+from array import array
+
+STATIC_BLOCKED = 0x80  # Obstacle or hard obstacle on the tile
+UNIT_MASK = 0x7F       # Low bits count the live units standing on the tile
+REGION_SIZE = 8        # Tiles per side of a versioned region
+
+
+class OccupancyGrid:
+    """Map-wide walkability bitmap shared by all pathfinding.
+
+    Every tile is one byte: the high bit marks static terrain and the low bits
+    count the units standing on it, so "is this tile walkable" is one lookup.
+    Each REGION_SIZE square region carries a version that is bumped whenever
+    one of its tiles turns walkable or blocked, so cached paths can tell
+    whether the ground they cross has changed.
+    """
+
+    def __init__(self, width, height, tile_size, cells=None):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.cells = cells if cells is not None else bytearray(width * height)
+        self.regions_x = -(-width // REGION_SIZE)
+        self.region_versions = array("I", [0]) * (self.regions_x * -(-height // REGION_SIZE))
+
+    def share_cells(self, buffer):
+        """Copy the tiles into buffer (e.g. shared memory) and use it from now on."""
+        buffer[:] = self.cells
+        self.cells = buffer
+
+    @classmethod
+    def from_entities(cls, obstacles, hard_obstacles, units, tile_size, map_width, map_height):
+        """Build a throwaway grid from entity lists (map size given in pixels)."""
+        grid = cls(-(-int(map_width) // tile_size), -(-int(map_height) // tile_size), tile_size)
+        for obstacle in list(obstacles) + list(hard_obstacles):
+            rect = obstacle.rect
+            for y in range(rect.top // tile_size, (rect.bottom - 1) // tile_size + 1):
+                for x in range(rect.left // tile_size, (rect.right - 1) // tile_size + 1):
+                    grid.set_blocked((x, y))
+        for unit in units:
+            if unit.health > 0:
+                grid.add_unit(grid.tile_at(unit.rect.center))
+        return grid
+
+    def tile_at(self, position):
+        """Convert a world position in pixels to a tile coordinate."""
+        return int(position[0] // self.tile_size), int(position[1] // self.tile_size)
+
+    def tile_center(self, tile):
+        """Return the world position of a tile's center."""
+        return (tile[0] * self.tile_size + self.tile_size // 2,
+                tile[1] * self.tile_size + self.tile_size // 2)
+
+    def region_of(self, tile):
+        """Index of the versioned region containing tile."""
+        return (tile[1] // REGION_SIZE) * self.regions_x + tile[0] // REGION_SIZE
+
+    def _touch(self, tile, was_free, index):
+        if was_free != (not self.cells[index]):
+            region = self.region_of(tile)
+            self.region_versions[region] = (self.region_versions[region] + 1) & 0xFFFFFFFF
+
+    def in_bounds(self, tile):
+        return 0 <= tile[0] < self.width and 0 <= tile[1] < self.height
+
+    def is_walkable(self, tile):
+        """True if the tile is inside the map and free of terrain and units."""
+        x, y = tile
+        return 0 <= x < self.width and 0 <= y < self.height and not self.cells[y * self.width + x]
+
+    def is_passable(self, tile):
+        """True if the tile is inside the map and free of static terrain."""
+        x, y = tile
+        return 0 <= x < self.width and 0 <= y < self.height and not self.cells[y * self.width + x] & STATIC_BLOCKED
+
+    def set_blocked(self, tile, blocked=True):
+        """Mark or clear static terrain on a tile."""
+        if not self.in_bounds(tile):
+            return
+        index = tile[1] * self.width + tile[0]
+        was_free = not self.cells[index]
+        if blocked:
+            self.cells[index] |= STATIC_BLOCKED
+        else:
+            self.cells[index] &= UNIT_MASK
+        self._touch(tile, was_free, index)
+
+    def add_unit(self, tile):
+        if not self.in_bounds(tile):
+            return
+        index = tile[1] * self.width + tile[0]
+        if self.cells[index] & UNIT_MASK < UNIT_MASK:
+            was_free = not self.cells[index]
+            self.cells[index] += 1
+            self._touch(tile, was_free, index)
+
+    def remove_unit(self, tile):
+        if not self.in_bounds(tile):
+            return
+        index = tile[1] * self.width + tile[0]
+        if self.cells[index] & UNIT_MASK:
+            self.cells[index] -= 1
+            self._touch(tile, False, index)
+
+    def move_unit(self, old_tile, new_tile):
+        """Move one unit's occupancy between tiles."""
+        if old_tile != new_tile:
+            self.remove_unit(old_tile)
+            self.add_unit(new_tile)
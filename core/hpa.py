@@ -0,0 +1,353 @@
+import heapq
+from collections import deque
+
+NEIGHBORS = (
+    (1, 0), (-1, 0), (0, 1), (0, -1),
+    (1, 1), (-1, 1), (1, -1), (-1, -1)
+)
+MAX_ENTRANCE_WIDTH = 6  # Border openings this wide get an entrance at each end
+
+
+def bounded_bfs(is_open, source, bounds, target=None):
+    """Breadth-first search from source, restricted to bounds (x0, y0, x1, y1).
+
+    Returns (distances, parents) for every reached tile. Stops early once
+    target is reached, if one is given.
+    """
+    x0, y0, x1, y1 = bounds
+    distances = {source: 0}
+    parents = {source: None}
+    queue = deque([source])
+    while queue:
+        current = queue.popleft()
+        if current == target:
+            break
+        x, y = current
+        for dx, dy in NEIGHBORS:
+            neighbor = (x + dx, y + dy)
+            if neighbor in distances:
+                continue
+            if not (x0 <= neighbor[0] < x1 and y0 <= neighbor[1] < y1):
+                continue
+            if neighbor != target and not is_open(neighbor):
+                continue
+            distances[neighbor] = distances[current] + 1
+            parents[neighbor] = current
+            queue.append(neighbor)
+    return distances, parents
+
+
+class Route(list):
+    """Pixel waypoints for a long order, refined lazily from abstract tiles.
+
+    Behaves like the plain waypoint list Unit.set_path expects; call refine()
+    when it runs empty to append the next low-level segment.
+    """
+
+    def __init__(self, hierarchy, abstract_tiles):
+        super().__init__()
+        self.hierarchy = hierarchy
+        self.pending = deque(abstract_tiles)
+        self.refine()
+
+    def refine(self):
+        """Append waypoints for abstract hops until there is something to follow."""
+        while not self and len(self.pending) >= 2:
+            start = self.pending.popleft()
+            if start == self.pending[0]:
+                continue
+            segment = self.hierarchy.local_path(start, self.pending[0])
+            if not segment:
+                self.pending.clear()
+                break
+            self.extend(segment)
+        if len(self.pending) == 1 and self:
+            self.pending.clear()
+        return bool(self)
+
+    @classmethod
+    def restore(cls, hierarchy, waypoints, abstract_tiles):
+        """Rebuild a route part way through, from its waypoints and unrefined tiles."""
+        route = cls.__new__(cls)
+        list.__init__(route, waypoints)
+        route.hierarchy = hierarchy
+        route.pending = deque(abstract_tiles)
+        return route
+
+    def is_finished(self):
+        return not self and len(self.pending) < 2
+
+
+class RouteSearch:
+    """HPA* search for a Route that can be run a slice at a time, like utils.AStarSearch.
+
+    The first step links start and end to their cluster's entrances, costing
+    one expansion per tile those searches reach; later steps expand abstract
+    nodes. Once finished, tiles holds the abstract tiles ([] if there is no
+    way) and path the Route along them.
+    """
+
+    def __init__(self, hierarchy, start_tile, end_tile):
+        self.hierarchy = hierarchy
+        self.start_tile = start_tile
+        self.end_tile = end_tile
+        self.tiles = None
+        self.path = None
+        self.expansions = 0
+        self.open_set = None
+
+    @property
+    def finished(self):
+        return self.path is not None
+
+    def _connect(self):
+        """Temporarily connect start and end to their cluster's entrances."""
+        hierarchy = self.hierarchy
+        start_tile, end_tile = self.start_tile, self.end_tile
+        start_cluster = hierarchy.cluster_of(start_tile)
+        end_cluster = hierarchy.cluster_of(end_tile)
+        passable = hierarchy.grid.is_passable
+
+        start_distances, _ = bounded_bfs(passable, start_tile, hierarchy.cluster_bounds(start_cluster))
+        self.start_edges = {node: start_distances[node] for node in hierarchy.nodes.get(start_cluster, ()) if node in start_distances}
+        if start_cluster == end_cluster and end_tile in start_distances:
+            self.start_edges[end_tile] = start_distances[end_tile]
+        end_distances, _ = bounded_bfs(passable, end_tile, hierarchy.cluster_bounds(end_cluster))
+        self.end_edges = {node: end_distances[node] for node in hierarchy.nodes.get(end_cluster, ()) if node in end_distances}
+        self.expansions += len(start_distances) + len(end_distances)
+
+        # Ties on f are broken towards the goal, which keeps uniform-cost searches narrow
+        h = self._heuristic(start_tile)
+        self.open_set = [(h, h, 0, start_tile)]
+        self.g_score = {start_tile: 0}
+        self.came_from = {}
+
+    def _heuristic(self, tile):
+        return max(abs(tile[0] - self.end_tile[0]), abs(tile[1] - self.end_tile[1]))
+
+    def _finish(self, tiles):
+        """Keep the abstract tiles and start the Route, charging its first refinement."""
+        self.tiles = tiles
+        searched = self.hierarchy.expansions
+        self.path = Route(self.hierarchy, tiles)
+        self.expansions += self.hierarchy.expansions - searched
+
+    def step(self, max_expansions=None):
+        """Expand up to max_expansions nodes (all if None); True once finished."""
+        if self.path is not None:
+            return True
+        budget = None if max_expansions is None else self.expansions + max_expansions
+        if self.open_set is None:
+            self._connect()
+
+        start_tile, end_tile = self.start_tile, self.end_tile
+        open_set = self.open_set
+        g_score = self.g_score
+        came_from = self.came_from
+        intra = self.hierarchy.intra
+        links = self.hierarchy.links
+        end_edges = self.end_edges
+        heuristic = self._heuristic
+        while open_set:
+            if budget is not None and self.expansions >= budget:
+                return False
+            _, _, cost, current = heapq.heappop(open_set)
+            self.expansions += 1
+            if current == end_tile:
+                tiles = [current]
+                while current in came_from:
+                    current = came_from[current]
+                    tiles.append(current)
+                tiles.reverse()
+                self._finish(tiles)
+                return True
+            if cost > g_score[current]:
+                continue
+
+            if current == start_tile:
+                # A start standing on an entrance can also cross its border straight away
+                edges = list(self.start_edges.items())
+            else:
+                edges = list(intra.get(current, {}).items())
+            edges.extend((other, 1) for other in links.get(current, ()))
+            if current in end_edges:
+                edges.append((end_tile, end_edges[current]))
+
+            for neighbor, step in edges:
+                tentative = cost + step
+                if tentative < g_score.get(neighbor, tentative + 1):
+                    g_score[neighbor] = tentative
+                    came_from[neighbor] = current
+                    h = heuristic(neighbor)
+                    heapq.heappush(open_set, (tentative + h, h, tentative, neighbor))
+        self._finish([])
+        return True
+
+    def partial_path(self):
+        """None until finished: a unit keeps walking its current path while its route is planned."""
+        return self.path
+
+
+class HierarchicalPathfinder:
+    """HPA* abstraction of an OccupancyGrid.
+
+    The map is cut into square clusters. Walkable openings on each cluster
+    border become entrance nodes, linked across the border with cost 1 and to
+    the other entrances of their cluster by precomputed in-cluster distances.
+    Only static terrain is considered here; units are avoided when a route is
+    refined.
+    """
+
+    def __init__(self, grid, cluster_size=16):
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.clusters_x = -(-grid.width // cluster_size)
+        self.clusters_y = -(-grid.height // cluster_size)
+
+        self.border_links = {}  # (cluster, cluster) -> [(tile, tile), ...]
+        self.links = {}         # entrance tile -> set of entrance tiles across borders
+        self.intra = {}         # entrance tile -> {entrance tile in same cluster: distance}
+        self.nodes = {}         # cluster -> set of entrance tiles
+        self.expansions = 0     # Tiles searched refining routes so far, for path budgets
+
+        for cy in range(self.clusters_y):
+            for cx in range(self.clusters_x):
+                if cx + 1 < self.clusters_x:
+                    self._build_border((cx, cy), (cx + 1, cy))
+                if cy + 1 < self.clusters_y:
+                    self._build_border((cx, cy), (cx, cy + 1))
+        for cy in range(self.clusters_y):
+            for cx in range(self.clusters_x):
+                self._build_cluster((cx, cy))
+
+    def cluster_of(self, tile):
+        return tile[0] // self.cluster_size, tile[1] // self.cluster_size
+
+    def cluster_bounds(self, cluster):
+        x0 = cluster[0] * self.cluster_size
+        y0 = cluster[1] * self.cluster_size
+        return x0, y0, min(x0 + self.cluster_size, self.grid.width), min(y0 + self.cluster_size, self.grid.height)
+
+    def _adjacent_clusters(self, cluster):
+        cx, cy = cluster
+        for neighbor in ((cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1)):
+            if 0 <= neighbor[0] < self.clusters_x and 0 <= neighbor[1] < self.clusters_y:
+                yield neighbor
+
+    def _border_pairs(self, a, b):
+        """Tile pairs facing each other across the border between clusters a and b."""
+        ax0, ay0, ax1, ay1 = self.cluster_bounds(a)
+        if b[0] > a[0]:
+            return [((ax1 - 1, y), (ax1, y)) for y in range(ay0, ay1)]
+        return [((x, ay1 - 1), (x, ay1)) for x in range(ax0, ax1)]
+
+    def _build_border(self, a, b):
+        """(Re)compute the entrances on the border between clusters a and b."""
+        for first, second in self.border_links.pop((a, b), []):
+            self.links.get(first, set()).discard(second)
+            self.links.get(second, set()).discard(first)
+
+        passable = self.grid.is_passable
+        entrances = []
+        segment = []
+        for pair in self._border_pairs(a, b) + [None]:
+            if pair is not None and passable(pair[0]) and passable(pair[1]):
+                segment.append(pair)
+                continue
+            if segment:
+                if len(segment) >= MAX_ENTRANCE_WIDTH:
+                    entrances.extend((segment[0], segment[-1]))
+                else:
+                    entrances.append(segment[len(segment) // 2])
+                segment = []
+
+        for first, second in entrances:
+            self.links.setdefault(first, set()).add(second)
+            self.links.setdefault(second, set()).add(first)
+        self.border_links[(a, b)] = entrances
+
+    def _build_cluster(self, cluster):
+        """(Re)compute the in-cluster distances between a cluster's entrances."""
+        for node in self.nodes.pop(cluster, ()):
+            self.intra.pop(node, None)
+
+        nodes = set()
+        for neighbor in self._adjacent_clusters(cluster):
+            key = (cluster, neighbor) if neighbor > cluster else (neighbor, cluster)
+            for first, second in self.border_links.get(key, []):
+                nodes.add(first if self.cluster_of(first) == cluster else second)
+
+        bounds = self.cluster_bounds(cluster)
+        for node in nodes:
+            distances, _ = bounded_bfs(self.grid.is_passable, node, bounds)
+            self.intra[node] = {other: distances[other] for other in nodes if other != node and other in distances}
+        self.nodes[cluster] = nodes
+
+    def rebuild(self, tile):
+        """Refresh the abstraction after static terrain on tile changed."""
+        cluster = self.cluster_of(tile)
+        neighbors = list(self._adjacent_clusters(cluster))
+        for neighbor in neighbors:
+            self._build_border(min(cluster, neighbor), max(cluster, neighbor))
+        for affected in [cluster] + neighbors:
+            self._build_cluster(affected)
+
+    def _nearest_passable(self, tile, radius=2):
+        best = None
+        for dx in range(-radius, radius + 1):
+            for dy in range(-radius, radius + 1):
+                candidate = (tile[0] + dx, tile[1] + dy)
+                if self.grid.is_passable(candidate):
+                    distance = max(abs(dx), abs(dy))
+                    if best is None or distance < best[0]:
+                        best = (distance, candidate)
+        return best[1] if best else None
+
+    def begin_route(self, start, end):
+        """Start planning a long order between world positions; returns a RouteSearch."""
+        start_tile = self.grid.tile_at(start)
+        end_tile = self.grid.tile_at(end)
+        if not self.grid.is_passable(end_tile):
+            end_tile = self._nearest_passable(end_tile)
+        search = RouteSearch(self, start_tile, end_tile)
+        if end_tile is None or not self.grid.in_bounds(start_tile):
+            search.tiles = []
+            search.path = Route(self, [])
+        return search
+
+    def find_route(self, start, end):
+        """Plan a long order between world positions in one go; returns a Route."""
+        search = self.begin_route(start, end)
+        search.step()
+        return search.path
+
+    def abstract_path(self, start_tile, end_tile):
+        """Search the abstract graph; returns the list of tiles to pass through."""
+        search = RouteSearch(self, start_tile, end_tile)
+        search.step()
+        return search.tiles
+
+    def local_path(self, start_tile, end_tile):
+        """Low-level waypoints from one abstract tile to the next (start excluded)."""
+        clusters = (self.cluster_of(start_tile), self.cluster_of(end_tile))
+        bounds_a = self.cluster_bounds(clusters[0])
+        bounds_b = self.cluster_bounds(clusters[1])
+        bounds = (min(bounds_a[0], bounds_b[0]), min(bounds_a[1], bounds_b[1]),
+                  max(bounds_a[2], bounds_b[2]), max(bounds_a[3], bounds_b[3]))
+
+        # Prefer going around units; fall back to terrain only if they block the way
+        for is_open in (self.grid.is_walkable, self.grid.is_passable):
+            _, parents = bounded_bfs(is_open, start_tile, bounds, target=end_tile)
+            self.expansions += len(parents)
+            if end_tile in parents:
+                break
+        else:
+            return []
+
+        tiles = []
+        current = end_tile
+        while current != start_tile:
+            tiles.append(self.grid.tile_center(current))
+            current = parents[current]
+        tiles.reverse()
+        return tiles
@@ -0,0 +1,80 @@
+from core import utils
+from core.config import PATH_CLUSTER_SIZE, FLOW_FIELD_REGION_SIZE, PATH_STRATEGY
+from core.path_cache import PathCache
+from core.flow_field import FlowFieldService
+from core.hpa import HierarchicalPathfinder
+from core.path_workers import PathWorkerPool
+
+
+class Navigator:
+    """Pathfinding entry point for one map.
+
+    Short orders run a grid search (plain A* or Jump Point Search, picked by
+    strategy) on the occupancy grid. Orders spanning more than
+    long_range tiles search the HPA* abstract graph first and are refined
+    cluster by cluster as the unit walks. AI pursuit goes through shared flow
+    fields, so its cost grows with the number of goals rather than units.
+    """
+
+    def __init__(self, grid, cluster_size=PATH_CLUSTER_SIZE, long_range=None, strategy=PATH_STRATEGY):
+        self.grid = grid
+        self.strategy = strategy
+        self.cluster_size = cluster_size
+        self.long_range = long_range or cluster_size
+        self.hierarchy = None
+        self.flow_fields = FlowFieldService(grid, FLOW_FIELD_REGION_SIZE)
+        self.cache = PathCache(grid)
+        self.workers = None
+
+    def build_hierarchy(self):
+        """Precompute clusters and entrances once the map's terrain is in place."""
+        self.hierarchy = HierarchicalPathfinder(self.grid, self.cluster_size)
+
+    def start_workers(self, count=None):
+        """Offload short A* searches to a process pool (count=None uses every core)."""
+        if self.workers is None:
+            self.workers = PathWorkerPool(self.grid, count, self.strategy)
+
+    def stop_workers(self):
+        if self.workers is not None:
+            self.workers.close()
+            self.workers = None
+
+    def is_long_range(self, start, end):
+        start_tile = self.grid.tile_at(start)
+        end_tile = self.grid.tile_at(end)
+        distance = max(abs(start_tile[0] - end_tile[0]), abs(start_tile[1] - end_tile[1]))
+        return self.hierarchy is not None and distance > self.long_range
+
+    def remember(self, start, end, path):
+        """Store the result of a finished short search in the path cache."""
+        if not self.is_long_range(start, end):
+            self.cache.put(start, end, path)
+
+    def begin_search(self, start, end):
+        """Return a search that can be stepped in slices (see PathRequestQueue)."""
+        if self.is_long_range(start, end):
+            return self.hierarchy.begin_route(start, end)
+        path = self.cache.get(start, end)
+        if path is not None:
+            return utils.PlannedSearch(path)
+        return utils.SEARCH_STRATEGIES[self.strategy](start, end, self.grid)
+
+    def find_path(self, start, end):
+        """Return waypoints from start to end (world positions) for Unit.set_path."""
+        search = self.begin_search(start, end)
+        if not search.finished:
+            search.step()
+            self.remember(start, end, search.path)
+        return search.path
+
+    def find_pursuit_path(self, start, goal, max_steps=4):
+        """Next few waypoints towards goal from the goal region's shared flow field."""
+        return self.flow_fields.path_towards(start, goal, max_steps)
+
+    def set_blocked(self, tile, blocked=True):
+        """Change static terrain on a tile and rebuild only the clusters it touches."""
+        self.grid.set_blocked(tile, blocked)
+        if self.hierarchy:
+            self.hierarchy.rebuild(tile)
+        self.flow_fields.terrain_changed(tile)
@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from core.config import PATH_CACHE_SIZE
+
+
+class PathCache:
+    """Bounded LRU cache of grid search results, keyed by (start tile, end tile).
+
+    Each entry remembers the version of every grid region its path crosses.
+    A lookup whose regions have changed since is dropped as stale, so a unit
+    moving in one corner of the map leaves paths elsewhere cached.
+    """
+
+    def __init__(self, grid, max_size=PATH_CACHE_SIZE):
+        self.grid = grid
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _key(self, start, end):
+        return self.grid.tile_at(start), self.grid.tile_at(end)
+
+    def get(self, start, end):
+        """Return a copy of the cached path between world positions, or None."""
+        key = self._key(start, end)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        path, regions = entry
+        versions = self.grid.region_versions
+        if any(versions[region] != version for region, version in regions):
+            del self.entries[key]
+            self.invalidations += 1
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return list(path)
+
+    def put(self, start, end, path):
+        """Remember a found path; empty results are not cached."""
+        if not path:
+            return
+        grid = self.grid
+        regions = {grid.region_of(grid.tile_at(waypoint)) for waypoint in path}
+        regions.add(grid.region_of(grid.tile_at(end)))
+        versions = grid.region_versions
+        key = self._key(start, end)
+        self.entries[key] = (tuple(path), tuple((region, versions[region]) for region in regions))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        """Counters for tuning max_size under load."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,159 @@
+import logging
+from core.config import PATH_BUDGET_EXPANSIONS
+from core.hpa import Route
+
+EXPANSIONS_PER_SLICE = 64  # Nodes expanded between budget checks
+
+
+class PathRequest:
+    """Handle for a queued path search; the path is delivered to the unit when ready."""
+
+    def __init__(self, unit, goal, goal_tile):
+        self.unit = unit
+        self.goal = goal
+        self.goal_tile = goal_tile
+        self.start = None
+        self.search = None
+        self.future = None
+        self.path = None
+        self.cancelled = False
+
+    @property
+    def done(self):
+        return self.path is not None
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+class PathRequestQueue:
+    """Runs path searches for unit orders within a per-tick budget.
+
+    Newer orders are served first, a unit's repeated order for the same tile
+    reuses its pending request, and units start walking a partial path after
+    the first slice of work on their search. When the navigator has a worker
+    pool, short searches are handed to it instead and collected as they finish.
+
+    The budget is a count of search expansions rather than wall-clock time,
+    so the same orders always finish on the same tick.
+    """
+
+    def __init__(self, navigator, budget_expansions=PATH_BUDGET_EXPANSIONS):
+        self.navigator = navigator
+        self.budget_expansions = budget_expansions
+        self.pending = []   # Stack; the most recent request is last
+        self.by_unit = {}   # unit -> its latest request
+        self.in_flight = [] # Requests running in the navigator's worker pool
+
+    def submit(self, unit, goal):
+        """Queue a path for unit to goal (world position) and return its handle."""
+        goal_tile = self.navigator.grid.tile_at(goal)
+        request = self.by_unit.get(unit)
+        if request and not request.cancelled and not request.done and request.goal_tile == goal_tile:
+            return request
+        if request:
+            request.cancel()
+
+        request = PathRequest(unit, goal, goal_tile)
+        self.by_unit[unit] = request
+        self.pending.append(request)
+        return request
+
+    def cancel(self, unit):
+        request = self.by_unit.pop(unit, None)
+        if request:
+            request.cancel()
+
+    def outstanding(self):
+        """(unit, goal) of every search not yet delivered, oldest first."""
+        return [(request.unit, request.goal) for request in self.in_flight + self.pending if not request.cancelled]
+
+    def clear(self):
+        """Drop every request, e.g. before restoring a snapshot."""
+        for request in self.pending + self.in_flight:
+            request.cancel()
+        self.pending = []
+        self.in_flight = []
+        self.by_unit = {}
+
+    def __len__(self):
+        return sum(1 for request in self.pending + self.in_flight if not request.cancelled)
+
+    def _collect(self):
+        """Hand finished worker results to their units."""
+        still_running = []
+        for request in self.in_flight:
+            if request.cancelled:
+                self._forget(request)
+            elif not request.future.done():
+                still_running.append(request)
+            else:
+                self._forget(request)
+                try:
+                    path = request.future.result()
+                except Exception as e:
+                    logging.error(f"Path worker failed: {e}")
+                    continue
+                self.navigator.remember(request.start, request.goal, path)
+                if request.unit.health > 0:
+                    request.path = self._from_current_tile(request.unit, path)
+                    request.unit.set_path(request.path)
+        self.in_flight = still_running
+
+    def process(self):
+        """Spend up to the budget on pending searches, newest first."""
+        spent = 0
+        if self.in_flight:
+            self._collect()
+        workers = self.navigator.workers
+        while self.pending and spent < self.budget_expansions:
+            request = self.pending[-1]
+            unit = request.unit
+            if request.cancelled or unit.health <= 0:
+                self.pending.pop()
+                self._forget(request)
+                continue
+
+            if request.search is None:
+                request.start = unit.rect.center
+                request.search = self.navigator.begin_search(request.start, request.goal)
+                # Only short grid searches go to the workers; HPA* routes are planned here in slices
+                if workers and not request.search.finished and not self.navigator.is_long_range(request.start, request.goal):
+                    self.pending.pop()
+                    request.future = workers.submit(request.start, request.goal)
+                    self.in_flight.append(request)
+                    continue
+                first_slice = True
+            else:
+                first_slice = False
+
+            expansions = request.search.expansions
+            finished = request.search.step(EXPANSIONS_PER_SLICE)
+            spent += max(1, request.search.expansions - expansions)
+            if finished:
+                self.pending.pop()
+                self._forget(request)
+                self.navigator.remember(request.start, request.goal, request.search.path)
+                request.path = self._from_current_tile(unit, request.search.path)
+                unit.set_path(request.path)
+            elif first_slice:
+                partial = request.search.partial_path()
+                if partial is not None:  # None keeps the unit on its current path
+                    unit.set_path(list(partial))
+
+    def _forget(self, request):
+        if self.by_unit.get(request.unit) is request:
+            del self.by_unit[request.unit]
+
+    def _from_current_tile(self, unit, path):
+        """Drop waypoints the unit already walked past while following a partial path."""
+        if not path or not unit.path or isinstance(path, Route):
+            return path
+        grid = self.navigator.grid
+        current = grid.tile_at(unit.rect.center)
+        for index, waypoint in enumerate(path):
+            if grid.tile_at(waypoint) == current:
+                return path[index:]
+        return path
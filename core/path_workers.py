@@ -0,0 +1,55 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from core import utils
+from core.grid import OccupancyGrid
+
+# Per-process state of a worker, set up once by _init_worker
+_shared = None
+_grid = None
+
+
+def _init_worker(name, width, height, tile_size):
+    global _shared, _grid
+    _shared = shared_memory.SharedMemory(name=name)
+    _grid = OccupancyGrid(width, height, tile_size, cells=_shared.buf[:width * height])
+
+
+def _search(start, end, strategy):
+    return utils.find_path(start, end, _grid, strategy)
+
+
+class PathWorkerPool:
+    """Runs A* searches in a process pool over a shared-memory copy of the grid.
+
+    The grid's cells are moved into one shared block when the pool starts, so
+    workers map the terrain once and every later occupancy change is a single
+    byte write they see directly. Results are plain waypoint lists, the same
+    thing Unit.set_path takes.
+    """
+
+    def __init__(self, grid, workers=None, strategy="astar"):
+        self.grid = grid
+        self.strategy = strategy
+        size = grid.width * grid.height
+        self.shared = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.view = self.shared.buf[:size]
+        grid.share_cells(self.view)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self.shared.name, grid.width, grid.height, grid.tile_size)
+        )
+        logging.info(f"Path worker pool started with shared grid {self.shared.name}.")
+
+    def submit(self, start, end):
+        """Queue a search; returns a Future resolving to a list of waypoints."""
+        return self.executor.submit(_search, tuple(start), tuple(end), self.strategy)
+
+    def close(self):
+        """Stop the workers and give the grid a private copy of its cells back."""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.grid.cells = bytearray(self.view)
+        self.view.release()
+        self.shared.close()
+        self.shared.unlink()
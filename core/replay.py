@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from core.simulation import Simulation
+
+REPLAY_VERSION = 1
+
+
+def map_hash(map_file):
+    """sha256 of the map file, so a replay refuses to run on an edited map."""
+    with open(map_file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class Replay:
+    """A battle recorded as its seed, map and the player's orders by tick.
+
+    Everything else is re-simulated, so a replay is a few hundred bytes and
+    playback matches the original tick for tick. Playback runs headless at
+    full speed; use play(until_tick) to fast-forward to a moment of interest.
+    """
+
+    def __init__(self, seed, map_file, map_hash, difficulty=1.0, commands=(), ticks=0, tile_size=50):
+        self.seed = seed
+        self.map_file = map_file
+        self.map_hash = map_hash
+        self.difficulty = difficulty
+        self.commands = [tuple(command) for command in commands]  # (tick, kind, unit ids, args)
+        self.ticks = ticks
+        self.tile_size = tile_size
+
+    @classmethod
+    def from_simulation(cls, simulation):
+        return cls(simulation.seed, simulation.map_file, map_hash(simulation.map_file), simulation.start_difficulty,
+                   simulation.command_log, simulation.tick, simulation.tile_size)
+
+    def save(self, path):
+        data = {
+            "version": REPLAY_VERSION,
+            "seed": self.seed,
+            "map": self.map_file,
+            "map_hash": self.map_hash,
+            "difficulty": self.difficulty,
+            "tile_size": self.tile_size,
+            "ticks": self.ticks,
+            "commands": self.commands,
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != REPLAY_VERSION:
+            raise ValueError(f"Unsupported replay version {data.get('version')!r} in {path}")
+        return cls(data["seed"], data["map"], data["map_hash"], data["difficulty"],
+                   data["commands"], data["ticks"], data["tile_size"])
+
+    def simulation(self):
+        """A fresh Simulation set up exactly as the recorded battle began."""
+        if map_hash(self.map_file) != self.map_hash:
+            raise ValueError(f"{self.map_file} has changed since this replay was recorded")
+        return Simulation(self.map_file, self.tile_size, difficulty=self.difficulty, seed=self.seed)
+
+    def play(self, simulation=None, until_tick=None, on_tick=None):
+        """Re-simulate up to until_tick (default: the recorded end); returns the Simulation.
+
+        on_tick(simulation, seconds) is called after every tick with the
+        wall time that tick took.
+        """
+        simulation = simulation or self.simulation()
+        until_tick = self.ticks if until_tick is None else min(until_tick, self.ticks)
+        commands = [command for command in self.commands if command[0] > simulation.tick]
+        next_command = 0
+        while simulation.tick < until_tick:
+            # Orders logged at tick T were queued during tick T - 1
+            while next_command < len(commands) and commands[next_command][0] == simulation.tick + 1:
+                _, kind, ids, args = commands[next_command]
+                simulation.order(kind, ids, *args)
+                next_command += 1
+            began = time.perf_counter()
+            simulation.step()
+            if on_tick:
+                on_tick(simulation, time.perf_counter() - began)
+        return simulation
+
+
+def save_replay(simulation, directory):
+    """Write simulation's replay into directory; returns the path, or None on failure."""
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, time.strftime("%Y%m%d-%H%M%S") + f"-{simulation.seed}.json")
+        Replay.from_simulation(simulation).save(path)
+    except OSError as e:
+        logging.error(f"Could not save replay: {e}")
+        return None
+    logging.info(f"Replay saved to {path}")
+    return path
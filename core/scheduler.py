@@ -0,0 +1,64 @@
+import heapq
+import itertools
+
+
+class EventScheduler:
+    """Priority queue of events keyed by simulation tick.
+
+    schedule() and pop_due() are O(log n). Events due on the same tick come
+    out in the order they were scheduled. Cancelled events stay in the heap
+    until they surface, and the heap is rebuilt once they outnumber the live
+    ones.
+    """
+
+    def __init__(self):
+        self.heap = []  # [tick, sequence, payload, live]
+        self.sequence = itertools.count()
+        self.live = 0
+        self.cancelled = 0
+
+    def __len__(self):
+        return self.live
+
+    def schedule(self, tick, payload):
+        """Queue payload for tick; returns a handle that cancel() accepts."""
+        event = [tick, next(self.sequence), payload, True]
+        heapq.heappush(self.heap, event)
+        self.live += 1
+        return event
+
+    def cancel(self, event):
+        if event[3]:
+            event[3] = False
+            self.live -= 1
+            self.cancelled += 1
+            if self.cancelled > self.live and self.cancelled > 64:
+                self.heap = [entry for entry in self.heap if entry[3]]
+                heapq.heapify(self.heap)
+                self.cancelled = 0
+
+    @staticmethod
+    def is_live(event):
+        """True until event has come out of pop_due() or been cancelled."""
+        return event[3]
+
+    def pop_due(self, tick):
+        """Yield the payloads of live events scheduled at or before tick, in order."""
+        heap = self.heap
+        while heap and heap[0][0] <= tick:
+            event = heapq.heappop(heap)
+            if event[3]:
+                event[3] = False
+                self.live -= 1
+                yield event[2]
+            else:
+                self.cancelled -= 1
+
+    def pending(self):
+        """(tick, payload) of every live event, in the order they will come out."""
+        return [(event[0], event[2]) for event in sorted(self.heap) if event[3]]
+
+    def clear(self):
+        self.heap.clear()
+        self.live = 0
+        self.cancelled = 0
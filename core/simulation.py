@@ -0,0 +1,182 @@
+import logging
+import random
+import numpy as np
+import pygame
+from core.path_scheduler import PathRequestQueue
+from mechanics.combat_manager import CombatManager
+from mechanics.map_manager import MapManager
+
+
+class Player:
+    def __init__(self):
+        self.score = 0
+
+
+class Simulation:
+    """One battle: units, combat, bullets, flags and the win/lose checks.
+
+    Nothing here opens a window, plays sound or loads images, so battles run
+    the same on a headless machine. Presentation attaches as observers: any
+    object with on_<event> methods, called as events happen.
+
+    Events: shot(attacker, target), flag_captured(flag, team),
+    state_changed(state), tick(simulation), terrain_changed(tile_map, rect).
+
+    All randomness comes from one stream seeded with seed, path searches are
+    budgeted in expansions rather than time, and player orders go through
+    order() and are logged by tick, so a seed plus the command log replays a
+    battle exactly (see core.replay). Worker pool paths arrive whenever the
+    workers finish, so path_workers gives up that guarantee.
+    """
+
+    def __init__(self, map_file="assets/maps/test_map.txt", tile_size=50, difficulty=1.0, path_workers=0, weapons=None, seed=None):
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.map_file = map_file
+        self.map_manager = MapManager(map_file, tile_size, weapons, self.rng)
+        self.map_manager.load_map()
+        self.tile_size = tile_size
+        self.teams = self.map_manager.get_teams()
+        self.units = self.map_manager.get_units()
+        self.store = self.map_manager.get_unit_store()
+        self.tile_map = self.map_manager.get_tile_map()
+        self.obstacles = self.map_manager.get_obstacles()
+        self.hard_obstacles = self.map_manager.get_hard_obstacles()
+        self.flags = self.map_manager.get_flags()
+        self.navigator = self.map_manager.get_navigator()
+        if path_workers:
+            self.navigator.start_workers(path_workers)
+        self.path_queue = PathRequestQueue(self.navigator)
+        self.spatial_index = self.map_manager.get_spatial_index()
+
+        self.observers = []
+        self.combat_manager = CombatManager(self.spatial_index, observers=self.observers, rng=self.rng, store=self.store)
+        self.player = Player()
+        self.state = "GAME"
+        self.tick = 0
+        self.start_difficulty = difficulty  # Later changes are "difficulty" orders
+        self.set_difficulty(difficulty)
+
+        # Units are named in orders by their index in the map's unit list, which is also their store row
+        self.roster = list(self.units)
+        self.ally_teams = [i for i, team in enumerate(self.store.teams) if team.name == "Allies"]
+        self.ally_rows = np.isin(self.store.team[:self.store.count], self.ally_teams)  # Teams never change mid-battle
+        self.unit_ids = {unit: i for i, unit in enumerate(self.roster)}
+        self.pending_orders = []
+        self.command_log = []  # (tick, kind, unit ids, args) in the order applied
+
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        if observer in self.observers:
+            self.observers.remove(observer)
+
+    def notify(self, event, *args):
+        for observer in self.observers:
+            handler = getattr(observer, "on_" + event, None)
+            if handler:
+                handler(*args)
+
+    def set_terrain(self, tile, code):
+        """Make a tile GROUND, OBSTACLE or HARD_OBSTACLE (core.tile_map codes) for the rest of the battle.
+
+        Observers get the changed world rect. Terrain changes are not
+        recorded in snapshots or replays.
+        """
+        if self.map_manager.set_tile(tile, code):
+            size = self.tile_size
+            self.notify("terrain_changed", self.tile_map, pygame.Rect(tile[0] * size, tile[1] * size, size, size))
+
+    def set_difficulty(self, modifier):
+        for unit in self.units:
+            unit.set_difficulty_multiplier(modifier)
+        self.combat_manager.set_difficulty_multiplier(modifier)
+
+    def order(self, kind, units, *args):
+        """Queue a player order for the next tick.
+
+        kind is "select" (units become the selection), "move" (units path
+        to the world position in args) or "difficulty" (args is the new
+        modifier). units may be Units or roster ids.
+        """
+        ids = [unit if isinstance(unit, int) else self.unit_ids[unit] for unit in units]
+        self.pending_orders.append((kind, ids, args))
+
+    def _apply_order(self, kind, ids, args):
+        if kind == "select":
+            chosen = set(ids)
+            for i, unit in enumerate(self.roster):
+                if unit.selected != (i in chosen):
+                    unit.select(i in chosen)
+        elif kind == "move":
+            goal = tuple(args[0])
+            for i in ids:
+                unit = self.roster[i]
+                if unit.health > 0:
+                    self.path_queue.submit(unit, goal)
+        elif kind == "difficulty":
+            self.set_difficulty(args[0])
+        else:
+            raise ValueError(f"Unknown order {kind!r}")
+
+    def step(self):
+        """Advance the battle by one tick."""
+        self.tick += 1
+        orders, self.pending_orders = self.pending_orders, []
+        for kind, ids, args in orders:
+            self.command_log.append((self.tick, kind, ids, list(args)))
+            self._apply_order(kind, ids, args)
+        store = self.store
+        store.previous[:store.count] = store.position[:store.count]
+        self.path_queue.process()
+        self.combat_manager.handle_combat(self.units, self.obstacles, self.hard_obstacles)
+        if store.alive_count != len(self.units):
+            self.units = [u for u in self.units if u.health > 0]
+
+        allies = store.alive[:store.count] & self.ally_rows
+
+        # Check for flag captures
+        open_flags = [flag for flag in self.flags if not flag.is_captured()]
+        if open_flags:
+            rows = np.flatnonzero(allies)
+            rects = store.rect[rows]
+            sized = (rects[:, 2] > 0) & (rects[:, 3] > 0)
+            rows, rects = rows[sized], rects[sized]
+            for flag in open_flags:
+                unit = self._first_touching(flag.rect, rows, rects)
+                if unit:
+                    flag.capture(unit.team, self.player)
+                    self.notify("flag_captured", flag, unit.team)
+
+        state = self.state
+        # Check for win condition
+        if all(flag.is_captured() for flag in self.flags):
+            state = "WIN"
+
+        # Check for lose condition
+        if not allies.any():
+            state = "GAME_OVER"
+
+        if state != self.state:
+            self.state = state
+            logging.info(f"Battle ended at tick {self.tick}: {state}")
+            self.notify("state_changed", state)
+        self.notify("tick", self)
+
+    def _first_touching(self, rect, rows, rects):
+        """First unit, in roster order, among rows (with their non-empty rects) whose rect overlaps rect."""
+        x, y, width, height = rects.T
+        hits = np.flatnonzero((x < rect.right) & (x + width > rect.left) & (y < rect.bottom) & (y + height > rect.top))
+        return self.store.units[rows[hits[0]]] if len(hits) else None
+
+    def run(self, max_ticks):
+        """Step until the battle ends or max_ticks have passed; returns the final state."""
+        for _ in range(max_ticks):
+            if self.state != "GAME":
+                break
+            self.step()
+        return self.state
+
+    def close(self):
+        self.navigator.stop_workers()
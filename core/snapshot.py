@@ -0,0 +1,341 @@
+import json
+import os
+import struct
+from array import array
+from collections import deque
+import numpy as np
+from core.hpa import Route
+from core.replay import map_hash
+
+MAGIC = b"BSNP"
+SNAPSHOT_VERSION = 2
+STATES = ("GAME", "WIN", "GAME_OVER")
+
+# magic, version, roster size, seed, map sha256, tick, combat tick, state, score, difficulty now, at start
+HEADER = struct.Struct("<4sHIQ32sIIBidd")
+COUNT = struct.Struct("<I")
+
+# UnitStore columns saved per unit, then per-unit bookkeeping kept outside the store
+STORE_COLUMNS = ("position", "previous", "velocity", "rect", "tile", "waypoint", "health", "speed", "difficulty",
+                 "cooldown", "search_timer", "heading", "cover", "alive", "selected", "moving")
+UNIT_DTYPE = np.dtype([
+    ("position", "<f8", 2), ("previous", "<f8", 2), ("velocity", "<f8", 2), ("rect", "<i4", 4),
+    ("tile", "<i4", 2), ("waypoint", "<f8", 2), ("health", "<f8"), ("speed", "<f8"), ("difficulty", "<f8"),
+    ("cooldown", "<i4"), ("search_timer", "<i4"), ("heading", "i1"), ("cover", "i1"),
+    ("alive", "?"), ("selected", "?"), ("moving", "?"),
+    ("span", "<i4", 4), ("path_length", "<i4"), ("route_pending", "<i4"), ("indexed", "?"), ("route", "?"),
+])
+BULLET_DTYPE = np.dtype([
+    ("slot", "<i4"), ("position", "<f8", 2), ("previous", "<f8", 2), ("velocity", "<f8", 2),
+    ("damage", "<f8"), ("lifespan", "<i4"), ("target", "<i4"), ("team", "i1"), ("weapon", "i1"),
+])
+EVENT_DTYPE = np.dtype([("tick", "<u4"), ("attacker", "<i4"), ("target", "<i4")])
+REQUEST_DTYPE = np.dtype([("unit", "<i4"), ("goal", "<f8", 2)])
+CACHE_DTYPE = np.dtype([("start", "<i4", 2), ("end", "<i4", 2), ("points", "<i4"), ("regions", "<i4")])
+
+# Arrays in the order they follow the header, each prefixed with its length
+SECTIONS = (
+    ("units", UNIT_DTYPE),
+    ("path_points", np.dtype(("<f8", 2))),
+    ("route_tiles", np.dtype(("<i4", 2))),
+    ("bullets", BULLET_DTYPE),
+    ("bullet_free", np.dtype("<i4")),
+    ("events", EVENT_DTYPE),
+    ("flags", np.dtype("i1")),
+    ("requests", REQUEST_DTYPE),
+    ("grid_cells", np.dtype("u1")),
+    ("region_versions", np.dtype("<u4")),
+    ("unit_buckets", np.dtype("<i4")),  # cx, cy, n, n roster ids per occupied cell
+    ("cache", CACHE_DTYPE),
+    ("cache_points", np.dtype(("<f8", 2))),
+    ("cache_regions", np.dtype(("<i8", 2))),
+    ("rng", np.dtype("<u4")),
+    ("extra", np.dtype("u1")),  # UTF-8 JSON: map, orders, weapon names
+)
+
+
+def capture(simulation):
+    """Pack the battle's state into bytes that restore() can load back.
+
+    Units, bullets, volleys, flags, the occupancy grid, the unit spatial
+    hash, the path cache and the random stream are stored exactly. Searches
+    still running are stored as their unit and goal and start over on
+    restore. Terrain, weapons and anything loaded from disk are not stored:
+    a snapshot is restored into a Simulation of the same map and seed.
+    """
+    roster = simulation.roster
+    store = simulation.store
+    ids = simulation.unit_ids
+    teams = {team: i for i, team in enumerate(simulation.teams)}
+    unit_hash = simulation.spatial_index.units
+    combat = simulation.combat_manager
+    bullets = combat.bullets
+    weapon_names = sorted({unit.weapon.name for unit in roster})
+    weapon_ids = {name: i for i, name in enumerate(weapon_names)}
+
+    units = np.zeros(len(roster), dtype=UNIT_DTYPE)
+    for name in STORE_COLUMNS:
+        units[name] = getattr(store, name)[:len(roster)]
+    points, route_tiles = [], []
+    for unit, record in zip(roster, units):
+        span = unit_hash.object_cells.get(unit)
+        path = store.paths[unit.row]
+        remaining = path[store.path_index[unit.row]:]
+        record["span"] = span or (0, 0, 0, 0)
+        record["indexed"] = span is not None
+        record["path_length"] = len(remaining)
+        points.extend(remaining)
+        if isinstance(path, Route):
+            record["route"] = True
+            record["route_pending"] = len(path.pending)
+            route_tiles.extend(path.pending)
+
+    active = np.flatnonzero(bullets.active)
+    bullet_records = np.zeros(len(active), dtype=BULLET_DTYPE)
+    bullet_records["slot"] = active
+    bullet_records["position"] = bullets.position[active]
+    bullet_records["previous"] = bullets.previous[active]
+    bullet_records["velocity"] = bullets.velocity[active]
+    bullet_records["damage"] = bullets.damage[active]
+    bullet_records["lifespan"] = bullets.lifespan[active]
+    bullet_records["target"] = [ids[bullets.targets[slot]] for slot in active]
+    bullet_records["team"] = [teams[bullets.teams[slot]] for slot in active]
+    bullet_records["weapon"] = [weapon_ids[bullets.weapons[slot]] for slot in active]
+
+    events = combat.scheduled_bullets.pending()
+    event_records = np.array([(tick, ids[attacker], ids[target]) for tick, (attacker, target) in events], dtype=EVENT_DTYPE)
+    requests = np.array([(ids[unit], goal) for unit, goal in simulation.path_queue.outstanding()], dtype=REQUEST_DTYPE)
+
+    buckets = []
+    for (cx, cy), objects in unit_hash.buckets():
+        buckets.extend((cx, cy, len(objects)))
+        buckets.extend(ids[unit] for unit in objects)
+
+    cache = simulation.navigator.cache
+    cache_records = np.zeros(len(cache.entries), dtype=CACHE_DTYPE)
+    cache_points, cache_regions = [], []
+    for record, ((start, end), (path, regions)) in zip(cache_records, cache.entries.items()):
+        record["start"], record["end"] = start, end
+        record["points"], record["regions"] = len(path), len(regions)
+        cache_points.extend(path)
+        cache_regions.extend(regions)
+
+    grid = simulation.navigator.grid
+    rng_version, rng_state, _ = simulation.rng.getstate()
+    extra = {
+        "map": simulation.map_file,
+        "tile_size": simulation.tile_size,
+        "weapons": weapon_names,
+        "damage_by_weapon": bullets.damage_by_weapon,
+        "bounds": unit_hash.bounds,
+        "command_log": simulation.command_log,
+        "pending_orders": [[kind, ids_, list(args)] for kind, ids_, args in simulation.pending_orders],
+    }
+
+    arrays = {
+        "units": units,
+        "path_points": np.array(points, dtype=np.float64).reshape(-1, 2),
+        "route_tiles": np.array(route_tiles, dtype=np.int32).reshape(-1, 2),
+        "bullets": bullet_records,
+        "bullet_free": np.array(bullets.free, dtype=np.int32),
+        "events": event_records,
+        "flags": np.array([teams[flag.captured_by] if flag.captured_by else -1 for flag in simulation.flags], dtype=np.int8),
+        "requests": requests,
+        "grid_cells": np.frombuffer(bytes(grid.cells), dtype=np.uint8),
+        "region_versions": np.frombuffer(grid.region_versions, dtype=np.uint32),
+        "unit_buckets": np.array(buckets, dtype=np.int32),
+        "cache": cache_records,
+        "cache_points": np.array(cache_points, dtype=np.float64).reshape(-1, 2),
+        "cache_regions": np.array(cache_regions, dtype=np.int64).reshape(-1, 2),
+        "rng": np.array(rng_state, dtype=np.uint32),
+        "extra": np.frombuffer(json.dumps(extra, separators=(",", ":")).encode(), dtype=np.uint8),
+    }
+
+    parts = [HEADER.pack(
+        MAGIC, SNAPSHOT_VERSION, len(roster), simulation.seed, bytes.fromhex(map_hash(simulation.map_file)),
+        simulation.tick, combat.tick, STATES.index(simulation.state), simulation.player.score,
+        combat.difficulty_multiplier, simulation.start_difficulty,
+    )]
+    for name, dtype in SECTIONS:
+        array = np.ascontiguousarray(arrays[name], dtype=dtype.base)
+        parts.append(COUNT.pack(array.nbytes // dtype.itemsize))
+        parts.append(array.tobytes())
+    return b"".join(parts)
+
+
+def read(data):
+    """Split snapshot bytes into (header dict, arrays by section name)."""
+    if data[:4] != MAGIC:
+        raise ValueError("Not a battle snapshot")
+    fields = HEADER.unpack_from(data)
+    if fields[1] != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {fields[1]}")
+    header = dict(zip(("magic", "version", "units", "seed", "map_hash", "tick", "combat_tick",
+                       "state", "score", "difficulty", "start_difficulty"), fields))
+    header["map_hash"] = header["map_hash"].hex()
+    header["state"] = STATES[header["state"]]
+
+    arrays = {}
+    offset = HEADER.size
+    for name, dtype in SECTIONS:
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += count * dtype.itemsize
+    header.update(json.loads(arrays.pop("extra").tobytes()))
+    return header, arrays
+
+
+def restore(simulation, data):
+    """Put simulation back into the state captured in data.
+
+    simulation must be on the map and seed the snapshot was taken from (the
+    header from read() names both); everything already built for it is reused.
+    """
+    header, arrays = read(data)
+    if header["seed"] != simulation.seed or header["units"] != len(simulation.roster):
+        raise ValueError("Snapshot was taken from a different battle")
+    if header["map_hash"] != map_hash(simulation.map_file):
+        raise ValueError(f"{simulation.map_file} has changed since this snapshot was taken")
+
+    roster = simulation.roster
+    store = simulation.store
+    teams = simulation.teams
+    hierarchy = simulation.navigator.hierarchy
+    units = arrays["units"]
+    for name in STORE_COLUMNS:
+        getattr(store, name)[:len(roster)] = units[name]
+    store.alive_count = int(units["alive"].sum())
+    store.deaths.clear()
+
+    points = arrays["path_points"].tolist()
+    route_tiles = arrays["route_tiles"].tolist()
+    point_at = tile_at = 0
+    spans = {}
+    for unit, record in zip(roster, units):
+        if record["indexed"]:
+            spans[unit] = tuple(record["span"].tolist())
+        length = int(record["path_length"])
+        path = [tuple(point) for point in points[point_at:point_at + length]]
+        point_at += length
+        if record["route"]:
+            pending = int(record["route_pending"])
+            path = Route.restore(hierarchy, path, [tuple(tile) for tile in route_tiles[tile_at:tile_at + pending]])
+            tile_at += pending
+        store.paths[unit.row] = path
+        store.path_index[unit.row] = 0
+
+    simulation.units = [unit for unit, alive in zip(roster, units["alive"]) if alive]
+    simulation.tick = header["tick"]
+    simulation.state = header["state"]
+    simulation.player.score = header["score"]
+    simulation.command_log = [tuple(command) for command in header["command_log"]]
+    simulation.pending_orders = [(kind, ids, tuple(args)) for kind, ids, args in header["pending_orders"]]
+    simulation.rng.setstate((3, tuple(arrays["rng"].tolist()), None))
+    for flag, team in zip(simulation.flags, arrays["flags"]):
+        flag.captured_by = teams[team] if team >= 0 else None
+
+    grid = simulation.navigator.grid
+    grid.cells[:] = arrays["grid_cells"].tobytes()
+    grid.region_versions[:] = array("I", arrays["region_versions"].tobytes())
+
+    buckets = []
+    flat = arrays["unit_buckets"].tolist()
+    at = 0
+    while at < len(flat):
+        cx, cy, count = flat[at:at + 3]
+        buckets.append(((cx, cy), [roster[i] for i in flat[at + 3:at + 3 + count]]))
+        at += 3 + count
+    simulation.spatial_index.units.restore(buckets, spans, header["bounds"])
+
+    cache = simulation.navigator.cache
+    cache.entries.clear()
+    cache_points = arrays["cache_points"].tolist()
+    cache_regions = arrays["cache_regions"].tolist()
+    point_at = region_at = 0
+    for record in arrays["cache"]:
+        count, regions = int(record["points"]), int(record["regions"])
+        key = (tuple(record["start"].tolist()), tuple(record["end"].tolist()))
+        cache.entries[key] = (tuple(tuple(point) for point in cache_points[point_at:point_at + count]),
+                              tuple(tuple(region) for region in cache_regions[region_at:region_at + regions]))
+        point_at += count
+        region_at += regions
+
+    combat = simulation.combat_manager
+    combat.tick = header["combat_tick"]
+    combat.difficulty_multiplier = header["difficulty"]
+    combat.clear_scheduled_bullets()
+    for tick, attacker, target in arrays["events"].tolist():
+        combat.schedule_bullet(tick, roster[attacker], roster[target])
+
+    bullets = combat.bullets
+    bullets.clear()
+    records = arrays["bullets"]
+    while records.size and bullets.capacity <= records["slot"].max():
+        bullets._grow()
+    slots = records["slot"]
+    bullets.position[slots] = records["position"]
+    bullets.previous[slots] = records["previous"]
+    bullets.velocity[slots] = records["velocity"]
+    bullets.damage[slots] = records["damage"]
+    bullets.lifespan[slots] = records["lifespan"]
+    bullets.active[slots] = True
+    weapon_names = header["weapons"]
+    for slot, target, team, weapon in zip(slots.tolist(), records["target"].tolist(), records["team"].tolist(), records["weapon"].tolist()):
+        bullets.targets[slot] = roster[target]
+        bullets.teams[slot] = teams[team]
+        bullets.weapons[slot] = weapon_names[weapon]
+    bullets.free = arrays["bullet_free"].tolist()
+    bullets.count = len(slots)
+    bullets.damage_by_weapon = dict(header["damage_by_weapon"])
+
+    simulation.path_queue.clear()
+    for unit, goal in arrays["requests"].tolist():
+        simulation.path_queue.submit(roster[unit], tuple(goal))
+
+
+def save(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class Checkpoints:
+    """In-memory snapshots taken every interval ticks, newest last, for rewinding."""
+
+    def __init__(self, interval, keep):
+        self.interval = interval
+        self.snapshots = deque(maxlen=keep)  # (tick, snapshot bytes)
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def record(self, simulation):
+        """Call after each step; snapshots the battle when a checkpoint tick comes round."""
+        if simulation.tick % self.interval == 0 and (not self.snapshots or self.snapshots[-1][0] < simulation.tick):
+            self.snapshots.append((simulation.tick, capture(simulation)))
+
+    def rewind(self, simulation, ticks):
+        """Restore the newest checkpoint at least ticks old, dropping the ones after it.
+
+        Falls back to the oldest checkpoint kept; returns the tick restored to,
+        or None if there are none.
+        """
+        target = simulation.tick - ticks
+        while len(self.snapshots) > 1 and self.snapshots[-1][0] > target:
+            self.snapshots.pop()
+        if not self.snapshots:
+            return None
+        tick, data = self.snapshots[-1]
+        restore(simulation, data)
+        return tick
+
+    def clear(self):
+        self.snapshots.clear()
@@ -0,0 +1,166 @@
+import math
+from core.config import SPATIAL_CELL_SIZE
+
+
+class SpatialHash:
+    """Uniform grid that buckets objects by the world cells their rect overlaps.
+
+    Objects only need a rect attribute. Call update() after an object moves;
+    it is a no-op unless the object crossed into different cells. Buckets keep
+    insertion order, so query results are deterministic.
+    """
+
+    def __init__(self, cell_size=SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}         # (cx, cy) -> {obj: None}
+        self.object_cells = {}  # obj -> (cx0, cy0, cx1, cy1) it is filed under
+        self.bounds = None      # Cell span ever used, bounds ring searches
+
+    def __len__(self):
+        return len(self.object_cells)
+
+    def __contains__(self, obj):
+        return obj in self.object_cells
+
+    def _span(self, rect):
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def _file(self, obj, span):
+        cx0, cy0, cx1, cy1 = span
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                self.cells.setdefault((cx, cy), {})[obj] = None
+        self.object_cells[obj] = span
+        if self.bounds is None:
+            self.bounds = list(span)
+        else:
+            bounds = self.bounds
+            bounds[0], bounds[1] = min(bounds[0], cx0), min(bounds[1], cy0)
+            bounds[2], bounds[3] = max(bounds[2], cx1), max(bounds[3], cy1)
+
+    def _unfile(self, obj, span):
+        cx0, cy0, cx1, cy1 = span
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket is not None:
+                    bucket.pop(obj, None)
+                    if not bucket:
+                        del self.cells[(cx, cy)]
+
+    def insert(self, obj):
+        if obj in self.object_cells:
+            self.update(obj)
+        else:
+            self._file(obj, self._span(obj.rect))
+
+    def update(self, obj):
+        """Re-file obj after its rect changed."""
+        old = self.object_cells.get(obj)
+        span = self._span(obj.rect)
+        if old == span:
+            return
+        if old is not None:
+            self._unfile(obj, old)
+        self._file(obj, span)
+
+    def remove(self, obj):
+        span = self.object_cells.pop(obj, None)
+        if span is not None:
+            self._unfile(obj, span)
+
+    def buckets(self):
+        """(cell, objects in filing order) for every occupied cell, for snapshots."""
+        return [(cell, list(bucket)) for cell, bucket in self.cells.items()]
+
+    def restore(self, buckets, spans, bounds):
+        """Replace the contents with buckets and spans as returned by buckets()/object_cells."""
+        self.cells = {cell: dict.fromkeys(objects) for cell, objects in buckets}
+        self.object_cells = dict(spans)
+        self.bounds = list(bounds) if bounds is not None else None
+
+    def _candidates(self, cx0, cy0, cx1, cy1):
+        found = {}
+        cells = self.cells
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        return found
+
+    def query_rect(self, rect):
+        """Objects whose rect overlaps rect."""
+        if rect.width <= 0 or rect.height <= 0:
+            rect = rect.copy()
+            rect.normalize()
+            rect.width, rect.height = max(rect.width, 1), max(rect.height, 1)
+        return [obj for obj in self._candidates(*self._span(rect)) if obj.rect.colliderect(rect)]
+
+    def query_radius(self, center, radius):
+        """Objects whose rect center lies within radius of center."""
+        size = self.cell_size
+        x, y = center
+        span = (int((x - radius) // size), int((y - radius) // size),
+                int((x + radius) // size), int((y + radius) // size))
+        radius_sq = radius * radius
+        result = []
+        for obj in self._candidates(*span):
+            ox, oy = obj.rect.center
+            if (ox - x) ** 2 + (oy - y) ** 2 <= radius_sq:
+                result.append(obj)
+        return result
+
+    def nearest(self, center, k=1, predicate=None, max_distance=None):
+        """Up to k objects closest to center (by rect center), nearest first.
+
+        Searches rings of cells outwards and stops once no unvisited cell can
+        hold anything closer than the k-th object found.
+        """
+        if not self.cells:
+            return []
+        size = self.cell_size
+        x, y = center
+        ccx, ccy = int(x // size), int(y // size)
+        cx0, cy0, cx1, cy1 = self.bounds
+        max_ring = max(ccx - cx0, cx1 - ccx, ccy - cy0, cy1 - ccy, 0)
+        if max_distance is not None:
+            max_ring = min(max_ring, int(max_distance // size) + 1)
+
+        seen = set()
+        best = []  # (distance, order, obj)
+        order = 0
+        for ring in range(max_ring + 1):
+            # Anything in this ring or beyond is at least (ring - 1) cells away
+            if len(best) >= k and (ring - 1) * size > best[k - 1][0]:
+                break
+            for cx in range(ccx - ring, ccx + ring + 1):
+                for cy in (range(ccy - ring, ccy + ring + 1) if cx in (ccx - ring, ccx + ring) else (ccy - ring, ccy + ring)):
+                    bucket = self.cells.get((cx, cy))
+                    if not bucket:
+                        continue
+                    for obj in bucket:
+                        if obj in seen:
+                            continue
+                        seen.add(obj)
+                        if predicate is not None and not predicate(obj):
+                            continue
+                        ox, oy = obj.rect.center
+                        distance = math.hypot(ox - x, oy - y)
+                        if max_distance is not None and distance > max_distance:
+                            continue
+                        best.append((distance, order, obj))
+                        order += 1
+            best.sort(key=lambda entry: entry[:2])
+        return [obj for _, _, obj in best[:k]]
+
+
+class SpatialIndex:
+    """The map's spatial hashes, one layer per kind of entity."""
+
+    def __init__(self, cell_size=SPATIAL_CELL_SIZE):
+        self.units = SpatialHash(cell_size)
+        self.obstacles = SpatialHash(cell_size)
+        self.hard_obstacles = SpatialHash(cell_size)
@@ -0,0 +1,183 @@
+import mmap
+import struct
+import numpy as np
+from core.config import SPATIAL_CELL_SIZE
+
+MAGIC = b"BMAP"
+MAP_VERSION = 1
+HEADER = struct.Struct("<4sHIII")  # Magic, version, width, height, spawn count
+
+# Tile layer codes
+GROUND = 0
+OBSTACLE = 1
+HARD_OBSTACLE = 2
+TEXT_TILES = {"#": OBSTACLE, "X": HARD_OBSTACLE}
+
+# Spawn table: one record per ally ("U"), enemy ("E") or flag ("F"), in row-major map order
+SPAWN_KINDS = "UEF"
+SPAWN_DTYPE = np.dtype([("kind", "S1"), ("x", "<u4"), ("y", "<u4")])
+
+_text_codes = np.zeros(256, dtype=np.uint8)
+for _char, _code in TEXT_TILES.items():
+    _text_codes[ord(_char)] = _code
+
+
+class TileMap:
+    """A map as a (height, width) uint8 tile layer plus a spawn table.
+
+    Compiled maps (.bmap) are memory-mapped, so tiles is a read-only view
+    straight onto the file: opening one costs the same however many tiles
+    it has, and nothing is created per tile. Text maps are parsed into the
+    same shape with whole-array operations.
+    """
+
+    def __init__(self, tiles, spawns, source=None):
+        self.tiles = tiles
+        self.spawns = spawns
+        self.height, self.width = tiles.shape
+        self._source = source  # Keeps the mapping open as long as the views are alive
+
+    @classmethod
+    def from_text(cls, lines):
+        """Parse text map rows ('#' obstacle, 'X' hard obstacle, 'U'/'E' units, 'F' flags)."""
+        lines = [line.strip() for line in lines if line.strip()]
+        if not lines:
+            raise ValueError("Map file is empty or invalid!")
+        width = len(lines[0])
+        chars = np.frombuffer("".join(line.ljust(width, ".")[:width] for line in lines).encode("ascii"), dtype=np.uint8)
+        chars = chars.reshape(len(lines), width)
+        tiles = _text_codes[chars]
+        ys, xs = np.nonzero(np.isin(chars, np.frombuffer(SPAWN_KINDS.encode("ascii"), dtype=np.uint8)))
+        spawns = np.empty(len(ys), dtype=SPAWN_DTYPE)
+        spawns["kind"] = chars[ys, xs].view("S1")
+        spawns["x"], spawns["y"] = xs, ys
+        return cls(tiles, spawns)
+
+    @classmethod
+    def load(cls, path):
+        """Open a map file: compiled maps are memory-mapped, anything else is read as text."""
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                file.seek(0)
+                return cls.from_text(file.read().decode("ascii").splitlines())
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, width, height, spawn_count = HEADER.unpack_from(source)
+        if version != MAP_VERSION:
+            raise ValueError(f"{path}: compiled map version {version}, expected {MAP_VERSION}")
+        if len(source) != HEADER.size + width * height + spawn_count * SPAWN_DTYPE.itemsize:
+            raise ValueError(f"{path}: truncated or corrupt compiled map")
+        tiles = np.frombuffer(source, dtype=np.uint8, count=width * height, offset=HEADER.size).reshape(height, width)
+        spawns = np.frombuffer(source, dtype=SPAWN_DTYPE, count=spawn_count, offset=HEADER.size + width * height)
+        return cls(tiles, spawns, source)
+
+    def save(self, path):
+        """Write the compiled form: header, tile layer, spawn table."""
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, MAP_VERSION, self.width, self.height, len(self.spawns)))
+            file.write(np.ascontiguousarray(self.tiles, dtype=np.uint8).tobytes())
+            file.write(np.ascontiguousarray(self.spawns, dtype=SPAWN_DTYPE).tobytes())
+
+    def set_tile(self, tile, code):
+        """Change one tile's code. A memory-mapped layer is copied on the first change, never written back."""
+        if not self.tiles.flags.writeable:
+            self.tiles = self.tiles.copy()
+        x, y = tile
+        self.tiles[y, x] = code
+
+    def blocked(self):
+        """Flat bool mask of tiles with static terrain, row-major like OccupancyGrid.cells."""
+        return (self.tiles != GROUND).ravel()
+
+
+class TileObstacles:
+    """The obstacles of one tile code, made into objects only when asked for.
+
+    Stands in for both an obstacle list (len, iteration and indexing in map
+    order) and a SpatialHash (query_rect, in the order the hash would give),
+    so cover checks, bullets and the A* fallback keep working while a big
+    map never holds an object per obstacle tile. Each tile's object is
+    created once and reused, so identities stay stable.
+    """
+
+    def __init__(self, tile_map, code, factory, tile_size, cell_size=SPATIAL_CELL_SIZE):
+        self.tile_map = tile_map
+        self.code = code
+        self.factory = factory  # position -> obstacle, e.g. entities.obstacle.Obstacle
+        self.tile_size = tile_size
+        self.cell_size = cell_size
+        self._indices = None
+        self._objects = {}  # Flat tile index -> obstacle
+        self._size = None   # (width, height) of an obstacle's rect
+
+    @property
+    def indices(self):
+        """Flat indices of this code's tiles in map order, found on first use."""
+        if self._indices is None:
+            self._indices = np.flatnonzero(self.tile_map.tiles.ravel() == self.code)
+        return self._indices
+
+    def tile_changed(self, tile):
+        """Forget what was worked out from a tile whose code has just changed."""
+        self._objects.pop(tile[1] * self.tile_map.width + tile[0], None)
+        self._indices = None
+
+    def _object(self, index):
+        obstacle = self._objects.get(index)
+        if obstacle is None:
+            y, x = divmod(index, self.tile_map.width)
+            obstacle = self._objects[index] = self.factory((x * self.tile_size, y * self.tile_size))
+        return obstacle
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        for index in self.indices.tolist():
+            yield self._object(index)
+
+    def __getitem__(self, i):
+        return self._object(int(self.indices[i]))
+
+    def overlapping(self, left, top, right, bottom):
+        """Bool per rect, given as int arrays of edges, that overlaps one of these obstacles.
+
+        Answers straight from the tile layer, for many rects at once, what
+        query_rect plus colliderect would.
+        """
+        if self._size is None:
+            self._size = self.factory((0, 0)).rect.size
+        width, height = self._size
+        size = self.tile_size
+        # Tiles whose obstacle rect [x * size, x * size + width) can reach the rect
+        x0, x1 = (left - width) // size + 1, (right - 1) // size
+        y0, y1 = (top - height) // size + 1, (bottom - 1) // size
+        hit = np.zeros(len(left), dtype=bool)
+        if not len(left):
+            return hit
+        tiles = self.tile_map.tiles
+        for dy in range(int((y1 - y0).max()) + 1):
+            for dx in range(int((x1 - x0).max()) + 1):
+                x, y = x0 + dx, y0 + dy
+                inside = (x <= x1) & (y <= y1) & (x >= 0) & (y >= 0) & (x < self.tile_map.width) & (y < self.tile_map.height)
+                hit[inside] |= tiles[y[inside], x[inside]] == self.code
+        return hit
+
+    def query_rect(self, rect):
+        """Obstacles whose rect overlaps rect."""
+        size = self.tile_size
+        width, height = self.tile_map.width, self.tile_map.height
+        x0, y0 = max(rect.left // size, 0), max(rect.top // size, 0)
+        x1, y1 = min((rect.right - 1) // size + 1, width), min((rect.bottom - 1) // size + 1, height)
+        if x0 >= x1 or y0 >= y1:
+            return []
+        ys, xs = np.nonzero(self.tile_map.tiles[y0:y1, x0:x1] == self.code)
+        if not len(ys):
+            return []
+        xs, ys = xs + x0, ys + y0
+        # Cell by cell, then map order within a cell, as SpatialHash files them
+        order = np.lexsort((xs, ys, xs * size // self.cell_size, ys * size // self.cell_size))
+        found = (self._object(int(index)) for index in (ys[order] * width + xs[order]).tolist())
+        return [obstacle for obstacle in found if obstacle.rect.colliderect(rect)]
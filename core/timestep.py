@@ -0,0 +1,34 @@
+from core.config import SIM_RATE, MAX_CATCH_UP_TICKS
+
+
+class FixedTimestep:
+    """Accumulator that turns variable frame times into whole simulation ticks.
+
+    advance(frame_seconds) says how many ticks to run this frame; alpha is how
+    far the display sits between the last two ticks, for interpolation. At
+    most max_steps ticks run per frame; time beyond that is dropped, so a slow
+    machine plays the battle slower instead of falling ever further behind.
+    """
+
+    def __init__(self, rate=SIM_RATE, max_steps=MAX_CATCH_UP_TICKS):
+        self.tick_seconds = 1.0 / rate
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.dropped = 0.0  # Seconds of simulation skipped by the catch-up cap
+
+    def advance(self, frame_seconds):
+        self.accumulator += frame_seconds
+        steps = int(self.accumulator // self.tick_seconds)
+        if steps > self.max_steps:
+            self.dropped += (steps - self.max_steps) * self.tick_seconds
+            steps = self.max_steps
+            self.accumulator = self.accumulator % self.tick_seconds + steps * self.tick_seconds
+        self.accumulator -= steps * self.tick_seconds
+        return steps
+
+    @property
+    def alpha(self):
+        return self.accumulator / self.tick_seconds
+
+    def reset(self):
+        self.accumulator = 0.0
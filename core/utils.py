@@ -1,84 +1,303 @@
 import heapq
-import pygame
 import math
+from core.grid import OccupancyGrid
 
-def astar_pathfinding(start, end, obstacles, hard_obstacles, units, tile_size, map_width, map_height):
-    start_tile = (start[0] // tile_size, start[1] // tile_size)
-    end_tile = (end[0] // tile_size, end[1] // tile_size)
+DIRECTIONS = (
+    (1, 0), (-1, 0), (0, 1), (0, -1),
+    (1, 1), (-1, 1), (1, -1), (-1, -1)
+)
 
-    if start_tile == end_tile:
-        return [start]
 
-    def heuristic(a, b):
-        dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
-        return dx + dy + (math.sqrt(2) - 2) * min(dx, dy)
+def heuristic(a, b):
+    dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+    return dx + dy + (math.sqrt(2) - 2) * min(dx, dy)
 
-    def is_valid_tile(tile):
+
+class AStarSearch:
+    """A* search on an OccupancyGrid that can be run a slice at a time.
+
+    Call step() until it returns True, then read path. While it is running,
+    partial_path() gives the route to the most promising tile found so far.
+    """
+
+    def __init__(self, start, end, grid):
+        self.grid = grid
+        self.start = start
+        self.start_tile = grid.tile_at(start)
+        self.end_tile = grid.tile_at(end)
+        self.path = None
+        self.expansions = 0
+
+        if self.start_tile == self.end_tile:
+            self.path = [start]
+            return
+
+        if not grid.is_walkable(self.end_tile):
+            possible_tiles = []
+            for dx in range(-2, 3):
+                for dy in range(-2, 3):
+                    tile = (self.end_tile[0] + dx, self.end_tile[1] + dy)
+                    if grid.is_walkable(tile):
+                        distance = heuristic(self.start_tile, tile)
+                        possible_tiles.append((distance, tile))
+
+            if possible_tiles:
+                possible_tiles.sort()
+                self.end_tile = possible_tiles[0][1]
+
+        self.open_set = [(0, self.start_tile)]
+        self.open_set_lookup = {self.start_tile}
+        self.came_from = {}
+        self.g_score = {self.start_tile: 0}
+        self.closest = (heuristic(self.start_tile, self.end_tile), self.start_tile)
+
+    @property
+    def finished(self):
+        return self.path is not None
+
+    def _trace(self, current):
+        tile_size = self.grid.tile_size
+        path = []
+        while current in self.came_from:
+            path.append((current[0] * tile_size + tile_size // 2, current[1] * tile_size + tile_size // 2))
+            current = self.came_from[current]
+        path.reverse()
+        return path
+
+    def step(self, max_expansions=None):
+        """Expand up to max_expansions nodes (all if None); True once finished."""
+        if self.path is not None:
+            return True
+
+        is_valid_tile = self.grid.is_walkable
+        end_tile = self.end_tile
+        open_set = self.open_set
+        open_set_lookup = self.open_set_lookup
+        came_from = self.came_from
+        g_score = self.g_score
+        budget = max_expansions
+
+        while open_set:
+            if budget is not None:
+                if budget <= 0:
+                    return False
+                budget -= 1
+
+            _, current = heapq.heappop(open_set)
+            open_set_lookup.remove(current)
+            self.expansions += 1
+
+            if current == end_tile:
+                self.path = self._trace(current)
+                return True
+
+            x, y = current
+            for dx, dy in DIRECTIONS:
+                neighbor = (x + dx, y + dy)
+                if not is_valid_tile(neighbor):
+                    continue
+                tentative_g_score = g_score[current] + 1
+                if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    h = heuristic(neighbor, end_tile)
+                    if h < self.closest[0]:
+                        self.closest = (h, neighbor)
+
+                    if neighbor not in open_set_lookup:
+                        heapq.heappush(open_set, (tentative_g_score + h, neighbor))
+                        open_set_lookup.add(neighbor)
+
+        self.path = []
+        return True
+
+    def partial_path(self):
+        """Path to the explored tile closest to the goal (the full path once finished)."""
+        if self.path is not None:
+            return self.path
+        return self._trace(self.closest[1])
+
+
+class JumpPointSearch(AStarSearch):
+    """Jump Point Search: A* that only expands tiles where a path can bend.
+
+    Straight and diagonal runs are scanned ("jumped") until a forced neighbour
+    appears, which skips the many symmetric paths of an open uniform grid.
+    Paths are optimal for octile step costs and come back in the same
+    tile-by-tile waypoint format as AStarSearch.
+    """
+
+    def __init__(self, start, end, grid):
+        super().__init__(start, end, grid)
+        self.closed = set()
+
+    def _trace(self, current):
+        jump_points = [current]
+        while current in self.came_from:
+            current = self.came_from[current]
+            jump_points.append(current)
+        jump_points.reverse()
+
+        tile_size = self.grid.tile_size
+        path = []
+        for (x0, y0), (x1, y1) in zip(jump_points, jump_points[1:]):
+            dx = (x1 > x0) - (x1 < x0)
+            dy = (y1 > y0) - (y1 < y0)
+            x, y = x0, y0
+            while (x, y) != (x1, y1):
+                x += dx if x != x1 else 0
+                y += dy if y != y1 else 0
+                path.append((x * tile_size + tile_size // 2, y * tile_size + tile_size // 2))
+        return path
+
+    def _directions(self, tile):
+        """Directions worth jumping in from tile, pruned by how we arrived."""
+        parent = self.came_from.get(tile)
+        if parent is None:
+            return DIRECTIONS
+        walkable = self.grid.is_walkable
         x, y = tile
-        rect = pygame.Rect(x * tile_size, y * tile_size, tile_size, tile_size)
-        if any(rect.colliderect(obs) for obs in obstacles):
-            return False
-        if any(rect.colliderect(hard_obs) for hard_obs in hard_obstacles):
-            return False
-        if any(rect.colliderect(unit.rect) for unit in units if unit.alive()):
-            return False
-        return 0 <= x < map_width and 0 <= y < map_height
-
-    def get_neighbors(node):
-        x, y = node
-        neighbors = []
-        directions = [
-            (1, 0), (-1, 0), (0, 1), (0, -1),
-            (1, 1), (-1, 1), (1, -1), (-1, -1)
-        ]
-
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-            if is_valid_tile((nx, ny)):
-                neighbors.append((nx, ny))
-        return neighbors
-
-    if not is_valid_tile(end_tile):
-        possible_tiles = []
-        for dx in range(-2, 3):
-            for dy in range(-2, 3):
-                tile = (end_tile[0] + dx, end_tile[1] + dy)
-                if is_valid_tile(tile):
-                    distance = heuristic(start_tile, tile)
-                    possible_tiles.append((distance, tile))
-
-        if possible_tiles:
-            possible_tiles.sort()
-            end_tile = possible_tiles[0][1]
-
-    open_set = []
-    heapq.heappush(open_set, (0, start_tile))
-    open_set_lookup = {start_tile}
-    came_from = {}
-    g_score = {start_tile: 0}
-    f_score = {start_tile: heuristic(start_tile, end_tile)}
-    
-    while open_set:
-        _, current = heapq.heappop(open_set)
-        open_set_lookup.remove(current)
-
-        if current == end_tile:
-            path = []
-            while current in came_from:
-                path.append((current[0] * tile_size + tile_size // 2, current[1] * tile_size + tile_size // 2))
-                current = came_from[current]
-            path.reverse()
-            return path
-
-        for neighbor in get_neighbors(current):
-            tentative_g_score = g_score[current] + 1
-            if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
-                came_from[neighbor] = current
-                g_score[neighbor] = tentative_g_score
-                f_score[neighbor] = tentative_g_score + heuristic(neighbor, end_tile)
-
-                if neighbor not in open_set_lookup:
-                    heapq.heappush(open_set, (f_score[neighbor], neighbor))
-                    open_set_lookup.add(neighbor)
-
-    return []
+        dx = (x > parent[0]) - (x < parent[0])
+        dy = (y > parent[1]) - (y < parent[1])
+        if dx and dy:
+            directions = [(dx, 0), (0, dy), (dx, dy)]
+            if not walkable((x - dx, y)):
+                directions.append((-dx, dy))
+            if not walkable((x, y - dy)):
+                directions.append((dx, -dy))
+        elif dx:
+            directions = [(dx, 0)]
+            if not walkable((x, y + 1)):
+                directions.append((dx, 1))
+            if not walkable((x, y - 1)):
+                directions.append((dx, -1))
+        else:
+            directions = [(0, dy)]
+            if not walkable((x + 1, y)):
+                directions.append((1, dy))
+            if not walkable((x - 1, y)):
+                directions.append((-1, dy))
+        return directions
+
+    def _jump(self, tile, dx, dy):
+        """Scan from tile in (dx, dy); return the next jump point or None."""
+        cells = self.grid.cells
+        width, height = self.grid.width, self.grid.height
+        end_x, end_y = self.end_tile
+
+        def free(x, y):
+            return 0 <= x < width and 0 <= y < height and not cells[y * width + x]
+
+        def scan(x, y, dx, dy):
+            """Straight scan; returns the goal or first tile with a forced neighbour."""
+            while True:
+                x += dx
+                y += dy
+                if not free(x, y):
+                    return None
+                if x == end_x and y == end_y:
+                    return x, y
+                if dx:
+                    if (not free(x, y + 1) and free(x + dx, y + 1)) or (not free(x, y - 1) and free(x + dx, y - 1)):
+                        return x, y
+                elif (not free(x + 1, y) and free(x + 1, y + dy)) or (not free(x - 1, y) and free(x - 1, y + dy)):
+                    return x, y
+
+        x, y = tile
+        if not (dx and dy):
+            return scan(x, y, dx, dy)
+
+        while True:
+            x += dx
+            y += dy
+            if not free(x, y):
+                return None
+            if x == end_x and y == end_y:
+                return x, y
+            if (not free(x - dx, y) and free(x - dx, y + dy)) or (not free(x, y - dy) and free(x + dx, y - dy)):
+                return x, y
+            if scan(x, y, dx, 0) or scan(x, y, 0, dy):
+                return x, y
+
+    def step(self, max_expansions=None):
+        if self.path is not None:
+            return True
+
+        end_tile = self.end_tile
+        open_set = self.open_set
+        g_score = self.g_score
+        budget = max_expansions
+
+        while open_set:
+            if budget is not None:
+                if budget <= 0:
+                    return False
+                budget -= 1
+
+            _, current = heapq.heappop(open_set)
+            if current in self.closed:
+                continue
+            self.closed.add(current)
+            self.expansions += 1
+
+            if current == end_tile:
+                self.path = self._trace(current)
+                return True
+
+            for dx, dy in self._directions(current):
+                jump_point = self._jump(current, dx, dy)
+                if jump_point is None or jump_point in self.closed:
+                    continue
+                tentative_g_score = g_score[current] + heuristic(current, jump_point)
+                if tentative_g_score < g_score.get(jump_point, float("inf")):
+                    self.came_from[jump_point] = current
+                    g_score[jump_point] = tentative_g_score
+                    h = heuristic(jump_point, end_tile)
+                    if h < self.closest[0]:
+                        self.closest = (h, jump_point)
+                    heapq.heappush(open_set, (tentative_g_score + h, jump_point))
+
+        self.path = []
+        return True
+
+
+class PlannedSearch:
+    """A search whose path was produced up front, e.g. a cached path."""
+
+    finished = True
+    expansions = 0
+
+    def __init__(self, path):
+        self.path = path
+
+    def step(self, max_expansions=None):
+        return True
+
+    def partial_path(self):
+        return self.path
+
+
+SEARCH_STRATEGIES = {
+    "astar": AStarSearch,
+    "jps": JumpPointSearch,
+}
+
+
+def find_path(start, end, grid, strategy="astar"):
+    """Run one search to completion with the named strategy."""
+    search = SEARCH_STRATEGIES[strategy](start, end, grid)
+    search.step()
+    return search.path
+
+
+def astar_pathfinding(start, end, obstacles=(), hard_obstacles=(), units=(), tile_size=50, map_width=0, map_height=0, grid=None):
+    """Find a tile path from start to end (world positions).
+
+    Pass the map's shared OccupancyGrid as grid; the obstacle/unit lists are
+    only used to build a temporary grid when none is given.
+    """
+    if grid is None:
+        grid = OccupancyGrid.from_entities(obstacles, hard_obstacles, units, tile_size, map_width, map_height)
+    search = AStarSearch(start, end, grid)
+    search.step()
+    return search.path
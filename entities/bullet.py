@@ -1,70 +1,206 @@
-import pygame
 import random
+import numpy as np
+import pygame
 
-class Bullet(pygame.sprite.Sprite):
-    def __init__(self, start_pos, attacker, target_unit, speed=15, color=(255, 255, 0), radius=5, accuracy=80, enemies=[], hard_obstacles=[], difficulty_modifier=1):
-        super().__init__()
-        self.image = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, color, (radius, radius), radius)
-        self.rect = self.image.get_rect(center=start_pos)
-
-        self.position = pygame.math.Vector2(start_pos)
-        self.target_unit = target_unit
-        self.accuracy = accuracy  # Store accuracy for offset calculations
-        self.hard_obstacles = hard_obstacles  # Store hard obstacles
-
-        if target_unit:
-            self.target_pos = pygame.math.Vector2(target_unit.rect.center)
-            self.apply_accuracy_offset()
-        else:
-            self.target_pos = None
-            
-
-        # Calculate direction based on adjusted target position
-        direction_vector = self.target_pos - self.position if self.target_pos else pygame.math.Vector2(1, 0)
-        if direction_vector.length() == 0:
-            direction_vector = pygame.math.Vector2(1, 0)
-        self.difficulty_modifier = difficulty_modifier
-        self.damage = attacker.weapon.damage
-        self.speed = speed * self.difficulty_modifier
-        self.direction = direction_vector.normalize() * self.speed
-
-        self.lifespan = 100
-        self.color = color
+from core.config import per_tick, ticks
+
+BULLET_SPEED = 900  # Pixels per second
+BULLET_RADIUS = 5
+BULLET_COLOR = (255, 255, 0)
+BULLET_RANGE = 1500  # Pixels a bullet that hit nothing flies before it disappears
+BULLET_ACCURACY = 80
+SCALAR_PAIRS = 64  # Cells with fewer bullet-unit pairs are tested in plain Python, cheaper than NumPy calls
+
+
+class BulletPool:
+    """Every bullet in flight, kept as parallel NumPy arrays.
+
+    Slots are recycled through a free list, so firing does not allocate once
+    the pool has grown to the busiest volley. update() advances all bullets in
+    one vectorized step and resolves hits cell by cell against the spatial
+    index, testing each busy cell's bullets against its units as one array.
+    """
+
+    def __init__(self, capacity=256, radius=BULLET_RADIUS, color=BULLET_COLOR, rng=None):
+        self.rng = rng or random.Random()  # Aim deviation; the simulation's stream when given
         self.radius = radius
-        self.enemies = enemies  # Store the list of enemies
-
-    def apply_accuracy_offset(self):
-        """Modify the target position based on accuracy."""
-        if self.accuracy < 100:  # Only apply deviation if accuracy is not perfect
-            inaccuracy_factor = (100 - self.accuracy) * 3  # Higher inaccuracy means higher deviation
-            offset_x = random.uniform(-inaccuracy_factor, inaccuracy_factor)
-            offset_y = random.uniform(-inaccuracy_factor, inaccuracy_factor)
-            self.target_pos.x += offset_x
-            self.target_pos.y += offset_y
-
-    def update(self):
-        if self.target_unit and self.target_unit.health > 0:
-            self.target_pos = pygame.math.Vector2(self.target_unit.rect.center)
-            self.apply_accuracy_offset()  # Reapply inaccuracy if target moves
-
-        self.position += self.direction
-        self.rect.center = (round(self.position.x), round(self.position.y))
-
-        # Collision check with all enemies
-        for enemy in self.enemies:
-            if pygame.sprite.collide_rect(self, enemy):
+        self.color = color
+        self.position = np.zeros((capacity, 2), dtype=np.float64)
+        self.previous = np.zeros((capacity, 2), dtype=np.float64)  # Position before the last update, for interpolation
+        self.velocity = np.zeros((capacity, 2), dtype=np.float64)
+        self.damage = np.zeros(capacity, dtype=np.float64)
+        self.lifespan = np.zeros(capacity, dtype=np.int32)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.teams = [None] * capacity    # Owner team of each slot
+        self.targets = [None] * capacity  # Unit each slot was fired at
+        self.weapons = [None] * capacity  # Name of the weapon each slot was fired from
+        self.damage_by_weapon = {}        # Weapon name -> health taken off enemies so far
+        self.free = list(range(capacity - 1, -1, -1))
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self.active)
+
+    def _grow(self):
+        old = self.capacity
+        new = old * 2
+        for name in ("position", "previous", "velocity", "damage", "lifespan", "active"):
+            array = getattr(self, name)
+            grown = np.zeros((new,) + array.shape[1:], dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+        self.teams.extend([None] * old)
+        self.targets.extend([None] * old)
+        self.weapons.extend([None] * old)
+        self.free.extend(range(new - 1, old - 1, -1))
+
+    def spawn(self, start_pos, attacker, target, speed=BULLET_SPEED, accuracy=BULLET_ACCURACY, difficulty_modifier=1):
+        """Fire one bullet from start_pos at target; returns its slot."""
+        if not self.free:
+            self._grow()
+        slot = self.free.pop()
+
+        target_x, target_y = target.rect.center
+        if accuracy < 100:  # Only apply deviation if accuracy is not perfect
+            inaccuracy_factor = (100 - accuracy) * 3  # Higher inaccuracy means higher deviation
+            target_x += self.rng.uniform(-inaccuracy_factor, inaccuracy_factor)
+            target_y += self.rng.uniform(-inaccuracy_factor, inaccuracy_factor)
+
+        dx, dy = target_x - start_pos[0], target_y - start_pos[1]
+        length = (dx * dx + dy * dy) ** 0.5
+        if length == 0:
+            dx, dy, length = 1.0, 0.0, 1.0
+        step = per_tick(speed) * difficulty_modifier / length
+
+        self.position[slot] = start_pos
+        self.previous[slot] = start_pos
+        self.velocity[slot] = (dx * step, dy * step)
+        self.damage[slot] = attacker.weapon.damage
+        self.lifespan[slot] = ticks(BULLET_RANGE / speed)
+        self.active[slot] = True
+        self.teams[slot] = attacker.team
+        self.targets[slot] = target
+        self.weapons[slot] = attacker.weapon.name
+        self.count += 1
+        return slot
+
+    def release(self, slot):
+        if self.active[slot]:
+            self.active[slot] = False
+            self.teams[slot] = None
+            self.targets[slot] = None
+            self.weapons[slot] = None
+            self.free.append(slot)
+            self.count -= 1
+
+    def clear(self):
+        for slot in np.flatnonzero(self.active):
+            self.release(slot)
+
+    def active_positions(self, alpha=1.0):
+        """Positions of all live bullets, shape (n, 2), alpha of the way from their previous ones."""
+        if alpha >= 1.0:
+            return self.position[self.active]
+        previous = self.previous[self.active]
+        return previous + (self.position[self.active] - previous) * alpha
+
+    def update(self, spatial_index):
+        """Advance every bullet, apply hits and retire spent bullets."""
+        if not self.count:
+            return
+        active = self.active
+        self.previous[active] = self.position[active]
+        self.position[active] += self.velocity[active]
+
+        slots = np.flatnonzero(active)
+        centers = np.rint(self.position[slots]).astype(np.int64)
+        cell_size = spatial_index.units.cell_size
+        cells = centers // cell_size
+        order = np.lexsort((cells[:, 1], cells[:, 0]))
+        cells, slots, centers = cells[order], slots[order], centers[order]
+        boundaries = (np.flatnonzero(np.any(np.diff(cells, axis=0), axis=1)) + 1).tolist()
+
+        # A tile-backed obstacle set answers for every bullet at once; anything else is queried cell by cell
+        hard_obstacles = spatial_index.hard_obstacles
+        blocked = None
+        if hasattr(hard_obstacles, "overlapping"):
+            radius = self.radius
+            blocked = hard_obstacles.overlapping(centers[:, 0] - radius, centers[:, 1] - radius,
+                                                 centers[:, 0] + radius, centers[:, 1] + radius)
+
+        cell_list = cells.tolist()
+        for start, end in zip([0] + boundaries, boundaries + [len(slots)]):
+            cx, cy = cell_list[start]
+            self._resolve_cell(spatial_index, cx, cy, slots[start:end], centers[start:end],
+                               None if blocked is None else blocked[start:end])
+
+        self.lifespan[slots] -= 1
+        for slot in slots[self.lifespan[slots] <= 0]:
+            self.release(slot)
+
+    def _resolve_cell(self, spatial_index, cx, cy, slots, centers, blocked=None):
+        """Test one cell's bullets against the units and hard obstacles around it.
+
+        blocked, if given, already says which bullets overlap a hard obstacle.
+        """
+        radius = self.radius
+        cell_size = spatial_index.units.cell_size
+        area = pygame.Rect(cx * cell_size - radius, cy * cell_size - radius, cell_size + 2 * radius, cell_size + 2 * radius)
+        remaining = np.ones(len(slots), dtype=bool)
+
+        units = spatial_index.units.query_rect(area)
+        if units:
+            for row, enemy in self._unit_hits(units, slots, centers):
+                slot = slots[row]
                 if enemy.health > 0:
-                    enemy.take_damage(self.damage, self.position)
-                self.kill()
-                return  # Exit after collision
-
-        # Collision check with hard obstacles
-        for obstacle in self.hard_obstacles:
-            if pygame.sprite.collide_rect(self, obstacle):
-                self.kill()  # Bullet gets destroyed if it hits a hard obstacle
-                return
-
-        self.lifespan -= 1
-        if self.lifespan <= 0:
-            self.kill()
+                    health = enemy.health
+                    enemy.take_damage(self.damage[slot], tuple(self.position[slot]))
+                    weapon = self.weapons[slot]
+                    self.damage_by_weapon[weapon] = self.damage_by_weapon.get(weapon, 0) + health - enemy.health
+                self.release(slot)
+                remaining[row] = False
+
+        if blocked is not None:
+            for row in np.flatnonzero(blocked & remaining):
+                self.release(slots[row])
+            return
+        obstacles = spatial_index.hard_obstacles.query_rect(area)
+        if obstacles and remaining.any():
+            left = centers[:, :1] - radius
+            top = centers[:, 1:] - radius
+            rects = np.array([obstacle.rect for obstacle in obstacles], dtype=np.int64)
+            overlap = ((left < rects[:, 0] + rects[:, 2]) & (left + 2 * radius > rects[:, 0]) &
+                       (top < rects[:, 1] + rects[:, 3]) & (top + 2 * radius > rects[:, 1]))
+            for row in np.flatnonzero(overlap.any(axis=1) & remaining):
+                self.release(slots[row])
+
+    def _unit_hits(self, units, slots, centers):
+        """(bullet index, enemy) for each bullet touching an enemy, taking the first in units order."""
+        radius = self.radius
+        rects = units[0].store.rect[[unit.row for unit in units]]
+        teams = [self.teams[slot] for slot in slots.tolist()]
+        hits = []
+        if len(slots) * len(units) < SCALAR_PAIRS:
+            unit_rects = list(zip(units, rects.tolist()))
+            for row, ((x, y), team) in enumerate(zip(centers.tolist(), teams)):
+                for unit, (ux, uy, width, height) in unit_rects:
+                    if (x - radius < ux + width and x + radius > ux and y - radius < uy + height and y + radius > uy
+                            and unit.team is not team):
+                        hits.append((row, unit))
+                        break
+            return hits
+
+        left = centers[:, :1] - radius
+        top = centers[:, 1:] - radius
+        overlap = ((left < rects[:, 0] + rects[:, 2]) & (left + 2 * radius > rects[:, 0]) &
+                   (top < rects[:, 1] + rects[:, 3]) & (top + 2 * radius > rects[:, 1]))
+        for row in np.flatnonzero(overlap.any(axis=1)).tolist():
+            team = teams[row]
+            enemy = next((units[col] for col in np.flatnonzero(overlap[row]) if units[col].team is not team), None)
+            if enemy is not None:
+                hits.append((row, enemy))
+        return hits
@@ -1,57 +1,172 @@
+import numpy as np
 import pygame
 from core import utils
+from core.config import SIM_RATE, UNIT_SPEED, per_tick
 from entities import weapon
+from entities.unit_store import UnitStore, COVER_DIRECTIONS
+from mechanics import movement
+from mechanics.targeting import Targeting
 
-class Unit(pygame.sprite.Sprite):
-    def __init__(self, x, y, team, health=100, accuracy=80, speed=2, weapon=weapon.Pistol()):
-        super().__init__()
-        
-        self.tile_size = 50 
 
-        
+class Unit:
+    """One soldier, as a view onto its row of a UnitStore.
 
-        self.direction = pygame.Vector2(0, -1)  
-        
-        rect_size = self.tile_size // 2    # Smaller rect inside the circle
-        
-        self.image = pygame.Surface((rect_size, rect_size), pygame.SRCALPHA)
-        pygame.draw.rect(self.image, team.color, (0, 0, rect_size, rect_size))
-        
-        self.rect = self.image.get_rect(center=(x + self.tile_size // 2, y + self.tile_size // 2))
-        
-        self.position = pygame.math.Vector2(x, y)
-        self.health = health
-        self.team = team
+    The state lives in the store's arrays so systems can update every unit
+    at once; the properties here read and write this unit's row for code
+    that deals with one unit at a time. position, rect and friends return
+    fresh objects, so assign to them rather than changing them in place.
+    """
 
-        # Load and scale the original sprite based on team
-        if team.name == "Allies":
-            self.original_image = pygame.image.load("assets/sprites/soldiers_ally.png").convert_alpha()
-        else:
-            self.original_image = pygame.image.load("assets/sprites/soldiers_enemy.png").convert_alpha()
-
-        self.original_image = pygame.transform.scale(self.original_image, (self.tile_size, self.tile_size))  
+    def __init__(self, x, y, team, health=100, accuracy=80, speed=UNIT_SPEED, weapon=weapon.Pistol(), navigator=None, spatial_index=None, store=None):
+        self.tile_size = 50
+        self.store = store if store is not None else UnitStore(capacity=1, tile_size=self.tile_size)
+        self.team = team
+        self.weapon = weapon
+        self.row = self.store.add(self, x, y, team, weapon, health, accuracy, speed)
 
-        # Ensure self.image starts as the scaled image
-        self.image = self.original_image.copy()
+        rect_size = self.tile_size // 2    # Smaller rect inside the circle
+        rect = pygame.Rect(0, 0, rect_size, rect_size)
+        rect.center = (x + self.tile_size // 2, y + self.tile_size // 2)
+        self.store.rect[self.row] = tuple(rect)
+
+        # Units hold no surfaces; the renderer draws the named sprite turned to heading
+        self.sprite = "soldier_ally" if team.name == "Allies" else "soldier_enemy"
+
+        # Shared walkability grid; the unit keeps its tile's occupancy up to date
+        self.navigator = navigator
+        self.grid = navigator.grid if navigator else None
+        if self.grid:
+            self.tile = self.grid.tile_at(rect.center)
+            self.grid.add_unit(self.tile)
+
+        self.spatial_index = spatial_index
+        if self.spatial_index:
+            self.spatial_index.units.insert(self)
+        print(f"Unit {self.team.name} initialized at {rect.topleft} (Expected: {self.position})")
+
+    @property
+    def position(self):
+        return pygame.math.Vector2(self.store.position[self.row].tolist())
+
+    @position.setter
+    def position(self, value):
+        self.store.position[self.row] = tuple(value)
+
+    @property
+    def previous_position(self):
+        """Position one tick ago, for interpolated drawing."""
+        return pygame.math.Vector2(self.store.previous[self.row].tolist())
+
+    @previous_position.setter
+    def previous_position(self, value):
+        self.store.previous[self.row] = tuple(value)
+
+    @property
+    def direction(self):
+        return pygame.math.Vector2(self.store.velocity[self.row].tolist())
+
+    @direction.setter
+    def direction(self, value):
+        self.store.velocity[self.row] = tuple(value)
+
+    @property
+    def rect(self):
+        return pygame.Rect(self.store.rect[self.row].tolist())
+
+    @rect.setter
+    def rect(self, value):
+        self.store.rect[self.row] = tuple(value)
+
+    @property
+    def tile(self):
+        tile = self.store.tile[self.row]
+        return (int(tile[0]), int(tile[1])) if tile[0] >= 0 else None
+
+    @tile.setter
+    def tile(self, value):
+        self.store.tile[self.row] = value if value is not None else (-1, -1)
+
+    @property
+    def health(self):
+        return float(self.store.health[self.row])
+
+    @health.setter
+    def health(self, value):
+        self.store.health[self.row] = value
+
+    @property
+    def speed(self):
+        """Pixels per second; the store keeps it per tick."""
+        return float(self.store.speed[self.row]) * SIM_RATE
+
+    @speed.setter
+    def speed(self, value):
+        self.store.speed[self.row] = per_tick(value)
+
+    @property
+    def difficulty_multiplier(self):
+        return float(self.store.difficulty[self.row])
+
+    @difficulty_multiplier.setter
+    def difficulty_multiplier(self, value):
+        self.store.difficulty[self.row] = value
+
+    @property
+    def accuracy(self):
+        return float(self.store.accuracy[self.row])
+
+    @property
+    def cooldown_timer(self):
+        return int(self.store.cooldown[self.row])
+
+    @cooldown_timer.setter
+    def cooldown_timer(self, value):
+        self.store.cooldown[self.row] = value
+
+    @property
+    def search_timer(self):
+        return int(self.store.search_timer[self.row])
+
+    @search_timer.setter
+    def search_timer(self, value):
+        self.store.search_timer[self.row] = value
+
+    @property
+    def search_cooldown(self):
+        return int(self.store.search_cooldown[self.row])
+
+    @search_cooldown.setter
+    def search_cooldown(self, value):
+        self.store.search_cooldown[self.row] = value
+
+    @property
+    def heading(self):
+        """One of ROTATION_STEPS facings, None before the first update."""
+        heading = self.store.heading[self.row]
+        return int(heading) if heading >= 0 else None
+
+    @property
+    def selected(self):
+        return bool(self.store.selected[self.row])
+
+    @property
+    def in_cover(self):
+        return bool(self.store.cover[self.row] >= 0)
+
+    @property
+    def cover_direction(self):
+        cover = self.store.cover[self.row]
+        return COVER_DIRECTIONS[cover] if cover >= 0 else None
+
+    @property
+    def path(self):
+        """Waypoints still ahead of the unit."""
+        return self.store.remaining_path(self.row)
+
+    @path.setter
+    def path(self, path):
+        self.store.set_path(self.row, path)
 
-        self.selected = False
-        self.path = []
-        
-        
-        self.difficulty_multiplier = 1.0
-        
-        self.speed = speed * self.difficulty_multiplier
-        
-
-        self.cooldown_timer = 0
-        self.accuracy = accuracy*weapon.accuracy_modifier
-        self.in_cover = False
-        self.cover_direction = None
-        self.search_cooldown = 30
-        self.search_timer = 0
-        self.weapon = weapon
-        print(f"Unit {self.team.name} initialized at {self.rect.topleft} (Expected: {self.position})")
-    
     def update_speed(self, speed):
         self.speed = speed * self.difficulty_multiplier
 
@@ -61,93 +176,65 @@ class Unit(pygame.sprite.Sprite):
         print(f"Difficulty multiplier set to {multiplier}.")
 
     def check_cover(self, obstacles):
-        self.in_cover = False
-        self.cover_direction = None
+        self.store.cover[self.row] = -1
+        rect = self.rect
+        if self.spatial_index:
+            # Only obstacles within reach of the cover check can matter
+            cx, cy = rect.center
+            obstacles = self.spatial_index.obstacles.query_rect(pygame.Rect(cx - 40, cy - 40, 80, 80))
         for obs in obstacles:
-            dx = self.rect.centerx - obs.rect.centerx
-            dy = self.rect.centery - obs.rect.centery
+            dx = rect.centerx - obs.rect.centerx
+            dy = rect.centery - obs.rect.centery
             if abs(dx) <= obs.rect.width // 2 + 10 and abs(dy) <= obs.rect.height // 2 + 10:
                 if abs(dx) > abs(dy):
-                    self.cover_direction = "left" if dx > 0 else "right"
+                    cover_direction = "left" if dx > 0 else "right"
                 else:
-                    self.cover_direction = "top" if dy > 0 else "bottom"
-                self.in_cover = True
+                    cover_direction = "top" if dy > 0 else "bottom"
+                self.store.cover[self.row] = COVER_DIRECTIONS.index(cover_direction)
                 return
 
     def take_damage(self, damage, attacker_position):
         if self.in_cover:
-            dx = self.rect.centerx - attacker_position[0]
-            dy = self.rect.centery - attacker_position[1]
+            rect = self.rect
+            dx = rect.centerx - attacker_position[0]
+            dy = rect.centery - attacker_position[1]
             attacker_direction = "left" if dx > 0 else "right" if abs(dx) > abs(dy) else "top" if dy > 0 else "bottom"
             if attacker_direction == self.cover_direction:
                 damage *= 0.001 * self.difficulty_multiplier
                 print(f"Unit is protected by cover in direction: {self.cover_direction}, damage:{damage}")
-        self.health -= damage * self.difficulty_multiplier
+        store, row = self.store, self.row
+        store.health[row] -= damage * store.difficulty[row]
+        if store.health[row] <= 0 and store.alive[row]:
+            store.kill(row)
+            self.leave_grid()
+            if self.spatial_index:
+                self.spatial_index.units.remove(self)
+
+    def update_tile(self):
+        """Move this unit's occupancy to the tile under its center, if it changed."""
+        movement.sync_tiles(self.store, np.array([self.row]))
+
+    def leave_grid(self):
+        """Release this unit's tile, e.g. when it dies."""
+        if self.grid and self.tile is not None:
+            self.grid.remove_unit(self.tile)
+            self.tile = None
 
     def select(self, is_selected):
-        self.selected = is_selected
-        self.image.fill((0, 255, 255) if is_selected else self.team.color)
+        self.store.selected[self.row] = is_selected
 
     def set_path(self, path):
-        self.path = path if path else []
+        self.store.set_path(self.row, path)
         if not path:
             print("No valid path found.")
 
     def move_towards_next_tile(self):
-        if self.path:
-            next_position = pygame.math.Vector2(self.path[0])
-            direction = next_position - self.position
-            if direction.length() < self.speed:
-                self.path.pop(0)
-                self.position = next_position
-            else:
-                direction = direction.normalize() * self.speed
-                self.position += direction
-
-                # Update direction based on movement
-                if direction.length() > 0:
-                    self.direction = direction
-
-            self.rect.topleft = (round(self.position.x), round(self.position.y))
-
+        movement.move_units(self.store, np.array([self.row]))
 
-    def search_and_destroy(self, enemies, obstacles, hard_obstacles, all_units):
+    def search_and_destroy(self, enemies, obstacles, hard_obstacles, all_units, targeting=None):
         """ Make unit move towards the nearest enemy if it's outranged, but stop jittering. """
-        if self.search_timer > 0:
-            self.search_timer -= 1
-            return
-        if not enemies:
-            return
-        
-        nearest_enemy = min(enemies, key=lambda e: pygame.math.Vector2(self.rect.center).distance_to(e.rect.center))
-        enemy_distance = pygame.math.Vector2(self.rect.center).distance_to(nearest_enemy.rect.center)
-
-        if enemy_distance <= self.weapon.range * 0.9:
-            return  
-
-
-        direction_to_enemy = (pygame.math.Vector2(nearest_enemy.rect.center) - self.position).normalize()
-        stop_position = self.position + direction_to_enemy * (enemy_distance - self.weapon.range + 5)  # Stop just before range
-
-        path = utils.astar_pathfinding(
-            start=self.rect.center,
-            end=stop_position,
-            obstacles=obstacles,
-            hard_obstacles=hard_obstacles,
-            units=all_units,
-            tile_size=self.tile_size,
-            map_width=self.tile_size * 20,
-            map_height=self.tile_size * 20
-        )
-
-        if not path:
-            self.position += direction_to_enemy * self.speed
-            self.rect.topleft = (round(self.position.x), round(self.position.y))
-        else:
-            self.set_path(path)
-
-        self.search_timer = self.search_cooldown
-        
+        targeting = targeting or Targeting(self.store)
+        movement.pursue(self.store, np.array([self.row]), targeting, obstacles, hard_obstacles, all_units)
 
     @staticmethod
     def move_in_formation(units, leader, destination, hard_obstacles, formation="line", spacing=50):
@@ -166,7 +253,8 @@ class Unit(pygame.sprite.Sprite):
             hard_obstacles=hard_obstacles,
             tile_size=leader.tile_size,
             map_width=leader.tile_size * 20,
-            map_height=leader.tile_size * 20
+            map_height=leader.tile_size * 20,
+            grid=leader.grid
         )
         leader.set_path(path)
         for i, unit in enumerate(units):
@@ -179,31 +267,12 @@ class Unit(pygame.sprite.Sprite):
                     hard_obstacles=hard_obstacles,
                     tile_size=unit.tile_size,
                     map_width=unit.tile_size * 20,
-                    map_height=unit.tile_size * 20
+                    map_height=unit.tile_size * 20,
+                    grid=unit.grid
                 )
                 unit.set_path(path)
 
-    def update(self, enemies, obstacles, hard_obstacles, units):
+    def update(self, enemies, obstacles, hard_obstacles, units, targeting=None):
         """ Update movement, combat logic, and AI behavior. """
-        if self.cooldown_timer > 0:
-            self.cooldown_timer -= 1
-
-        if self.selected:
-            self.move_towards_next_tile()
-            self.check_cover(obstacles)
-        else:
-            self.search_and_destroy(enemies, obstacles, hard_obstacles=hard_obstacles, all_units=units)
-
-        self.move_towards_next_tile()
-
-        # Rotate sprite based on movement direction
-        angle = -self.direction.angle_to(pygame.Vector2(0, 1))  
-
-        if self.direction.y > 0:  
-            angle += 180  
-
-        rotated_image = pygame.transform.rotate(self.original_image, angle)
-
-
-        self.rect = rotated_image.get_rect(center=self.rect.center)  # Maintain center
-        self.image = rotated_image
\ No newline at end of file
+        targeting = targeting or Targeting(self.store)
+        movement.update_units(self.store, np.array([self.row]), targeting, obstacles, hard_obstacles, units)
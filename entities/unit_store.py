@@ -0,0 +1,182 @@
+import numpy as np
+import pygame
+from core.config import ROTATION_STEPS, UNIT_SEARCH_INTERVAL, per_tick, ticks
+from core.hpa import Route
+
+COVER_DIRECTIONS = ("left", "right", "top", "bottom")
+
+# Per-row arrays and the value unused rows hold
+COLUMNS = {
+    "position": 0, "previous": 0, "velocity": 0, "rect": 0, "tile": -1, "waypoint": 0,
+    "health": 0, "speed": 0, "difficulty": 1, "accuracy": 0, "cooldown": 0, "search_timer": 0,
+    "search_cooldown": 0, "path_index": 0, "team": 0, "weapon": 0, "heading": -1, "cover": -1,
+    "alive": False, "selected": False, "moving": False,
+}
+
+_facing_sizes = {}
+
+
+def facing_size(heading, tile_size, steps=ROTATION_STEPS):
+    """Size of a tile-sized sprite turned to heading, as pygame.transform.rotate makes it."""
+    key = (heading, tile_size, steps)
+    size = _facing_sizes.get(key)
+    if size is None:
+        size = _facing_sizes[key] = pygame.transform.rotate(pygame.Surface((tile_size, tile_size)), heading * 360 / steps).get_size()
+    return size
+
+
+class UnitStore:
+    """Every unit's state as parallel NumPy arrays, one row per unit.
+
+    Rows are handed out in creation order and never reused, so a unit's row
+    is also its index in the map's roster. Unit objects are thin views onto
+    a row; the systems in mechanics.movement and mechanics.targeting, the
+    combat manager and the renderer work on whole columns at once instead.
+
+    Paths stay Python lists (or HPA Routes), one per row, walked with a
+    cursor; waypoint holds the point the unit is heading for right now.
+    """
+
+    def __init__(self, capacity=64, tile_size=50):
+        self.tile_size = tile_size
+        self.count = 0
+        self.alive_count = 0
+        self.position = np.zeros((capacity, 2), dtype=np.float64)  # Sprite top-left in world pixels
+        self.previous = np.zeros((capacity, 2), dtype=np.float64)  # Position one tick ago, for interpolated drawing
+        self.velocity = np.zeros((capacity, 2), dtype=np.float64)  # Last step taken; the unit faces along it
+        self.rect = np.zeros((capacity, 4), dtype=np.int64)        # x, y, width, height
+        self.tile = np.full((capacity, 2), -1, dtype=np.int32)     # Occupied grid tile, -1 once off the grid
+        self.waypoint = np.zeros((capacity, 2), dtype=np.float64)
+        self.health = np.zeros(capacity, dtype=np.float64)
+        self.speed = np.zeros(capacity, dtype=np.float64)          # Pixels per tick
+        self.difficulty = np.ones(capacity, dtype=np.float64)
+        self.accuracy = np.zeros(capacity, dtype=np.float64)
+        self.cooldown = np.zeros(capacity, dtype=np.int32)         # Ticks until the next volley
+        self.search_timer = np.zeros(capacity, dtype=np.int32)
+        self.search_cooldown = np.zeros(capacity, dtype=np.int32)  # Ticks between looks for an enemy
+        self.path_index = np.zeros(capacity, dtype=np.int32)       # Cursor into paths[row]
+        self.team = np.zeros(capacity, dtype=np.int16)             # Index into teams
+        self.weapon = np.zeros(capacity, dtype=np.int16)           # Index into weapons
+        self.heading = np.full(capacity, -1, dtype=np.int16)       # One of ROTATION_STEPS facings, -1 before the first update
+        self.cover = np.full(capacity, -1, dtype=np.int8)          # Index into COVER_DIRECTIONS, -1 out of cover
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.selected = np.zeros(capacity, dtype=bool)
+        self.moving = np.zeros(capacity, dtype=bool)               # waypoint is set
+        self.paths = []
+        self.deaths = []   # Rows killed since the combat manager last cancelled their volleys
+        self.units = []    # Unit view of each row
+        self.teams = []
+        self.weapons = []
+        self._team_ids = {}
+        self._weapon_ids = {}
+        self._weapon_columns = None
+        self._facing_sizes = None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self.alive)
+
+    def _grow(self):
+        old = self.capacity
+        for name, fill in COLUMNS.items():
+            array = getattr(self, name)
+            grown = np.full((old * 2,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+
+    def team_id(self, team):
+        team_id = self._team_ids.get(team)
+        if team_id is None:
+            team_id = self._team_ids[team] = len(self.teams)
+            self.teams.append(team)
+        return team_id
+
+    def weapon_id(self, weapon):
+        weapon_id = self._weapon_ids.get(id(weapon))
+        if weapon_id is None:
+            weapon_id = self._weapon_ids[id(weapon)] = len(self.weapons)
+            self.weapons.append(weapon)
+            self._weapon_columns = None
+        return weapon_id
+
+    def add(self, unit, x, y, team, weapon, health, accuracy, speed):
+        """Claim the next row for unit and fill in its starting state (speed in pixels per second); returns the row."""
+        if self.count == self.capacity:
+            self._grow()
+        row = self.count
+        self.count += 1
+        self.alive_count += 1
+        self.position[row] = self.previous[row] = (x, y)
+        self.velocity[row] = (0, -1)
+        self.health[row] = health
+        self.speed[row] = per_tick(speed)
+        self.accuracy[row] = accuracy * weapon.accuracy_modifier
+        self.search_cooldown[row] = ticks(UNIT_SEARCH_INTERVAL)
+        self.team[row] = self.team_id(team)
+        self.weapon[row] = self.weapon_id(weapon)
+        self.alive[row] = True
+        self.paths.append([])
+        self.units.append(unit)
+        return row
+
+    def weapon_column(self, name):
+        """Per-row array of a weapon stat (e.g. "range", "cooldown_ticks")."""
+        if self._weapon_columns is None:
+            self._weapon_columns = {}
+        column = self._weapon_columns.get(name)
+        if column is None:
+            column = self._weapon_columns[name] = np.array([getattr(weapon, name) for weapon in self.weapons], dtype=np.float64)
+        return column[self.weapon[:self.count]]
+
+    def facing_sizes(self):
+        """(ROTATION_STEPS, 2) sprite sizes by heading, as pygame.transform.rotate makes them."""
+        if self._facing_sizes is None:
+            self._facing_sizes = np.array([facing_size(heading, self.tile_size) for heading in range(ROTATION_STEPS)], dtype=np.int64)
+        return self._facing_sizes
+
+    def living_rows(self):
+        return np.flatnonzero(self.alive[:self.count])
+
+    def centers(self, rows):
+        """Integer rect centers of rows, shape (len(rows), 2), as pygame.Rect.center gives them."""
+        rect = self.rect[rows]
+        return rect[:, :2] + rect[:, 2:] // 2
+
+    def set_path(self, row, path):
+        path = path if path else []
+        self.paths[row] = path
+        self.path_index[row] = 0
+        self._load_waypoint(row)
+
+    def remaining_path(self, row):
+        path = self.paths[row]
+        return path[self.path_index[row]:]
+
+    def _load_waypoint(self, row):
+        path = self.paths[row]
+        index = self.path_index[row]
+        if index >= len(path) and isinstance(path, Route):
+            # A long order's next stretch is only worked out once the last one is walked
+            del path[:]
+            index = self.path_index[row] = 0
+            path.refine()
+        if index < len(path):
+            self.waypoint[row] = path[index]
+            self.moving[row] = True
+        else:
+            self.moving[row] = False
+
+    def advance(self, row):
+        """Step row's cursor past the waypoint it just reached."""
+        self.path_index[row] += 1
+        self._load_waypoint(row)
+
+    def kill(self, row):
+        if self.alive[row]:
+            self.alive[row] = False
+            self.alive_count -= 1
+            self.deaths.append(row)
+
@@ -1,8 +1,11 @@
+from core.config import ticks
+
+
 class Weapon:
-    def __init__(self, name, fire_rate, damage, bullets_per_volley, accuracy_modifier, range, sprite):
+    def __init__(self, name, cooldown, damage, bullets_per_volley, accuracy_modifier, range, sprite):
         """
         :param name: Name of the weapon.
-        :param fire_rate: Cooldown in frames between volleys.
+        :param cooldown: Seconds between volleys.
         :param damage: Damage per bullet.
         :param bullets_per_volley: Number of bullets fired per volley.
         :param accuracy: Accuracy of the weapon (percentage).
@@ -10,30 +13,35 @@ class Weapon:
         :param sprite: Path to the sprite image file.
         """
         self.name = name
-        self.fire_rate = fire_rate  # number of frames between shots (cooldown)
+        self.cooldown = cooldown  # Seconds between volleys
         self.damage = damage
         self.bullets_per_volley = bullets_per_volley
         self.accuracy_modifier = accuracy_modifier
         self.range = range
         self.sprite = sprite
 
+    @property
+    def cooldown_ticks(self):
+        """Simulation ticks between volleys."""
+        return ticks(self.cooldown)
+
     def __str__(self):
-        return (f"Weapon: {self.name}, Fire Rate: {self.fire_rate} frames, "
+        return (f"Weapon: {self.name}, Cooldown: {self.cooldown}s, "
                 f"Damage: {self.damage}, Bullets per Volley: {self.bullets_per_volley}, "
                 f"Accuracy Modifier: {self.accuracy_modifier}%, Range: {self.range}, "
                 f"Sprite: {self.sprite}")
 
 class Pistol(Weapon):
     def __init__(self):
-        # Baseline weapon: one bullet per volley, 60 frames cooldown, 10 damage per bullet, 90% accuracy, 300 range.
-        super().__init__(name="Pistol", fire_rate=60, damage=10, bullets_per_volley=1, accuracy_modifier=0.9, range=400, sprite="assets/sprites/pistol.png")
+        # Baseline weapon: one bullet per volley, 1 s cooldown, 10 damage per bullet, 90% accuracy, 400 range.
+        super().__init__(name="Pistol", cooldown=1.0, damage=10, bullets_per_volley=1, accuracy_modifier=0.9, range=400, sprite="assets/sprites/pistol.png")
 
 class MachineGun(Weapon):
     def __init__(self):
-        # Fast firing weapon: three bullets per volley, very short cooldown, lower damage per bullet, 70% accuracy, 200 range.
-        super().__init__(name="Machine Gun", fire_rate=15, damage=5, bullets_per_volley=3, accuracy_modifier=0.7, range=275, sprite="assets/sprites/machine_gun.png")
+        # Fast firing weapon: three bullets per volley, 0.25 s cooldown, lower damage per bullet, 70% accuracy, 275 range.
+        super().__init__(name="Machine Gun", cooldown=0.25, damage=5, bullets_per_volley=3, accuracy_modifier=0.7, range=275, sprite="assets/sprites/machine_gun.png")
 
 class SubmachineGun(Weapon):
     def __init__(self):
-        # A moderate option: two bullets per volley, 30 frames cooldown, moderate damage per bullet, 80% accuracy, 250 range.
-        super().__init__(name="Submachine Gun", fire_rate=30, damage=7, bullets_per_volley=2, accuracy_modifier=0.8, range=300, sprite="assets/sprites/submachine_gun.png")
+        # A moderate option: two bullets per volley, 0.5 s cooldown, moderate damage per bullet, 80% accuracy, 300 range.
+        super().__init__(name="Submachine Gun", cooldown=0.5, damage=7, bullets_per_volley=2, accuracy_modifier=0.8, range=300, sprite="assets/sprites/submachine_gun.png")
@@ -1,57 +1,66 @@
 import pygame
 import logging
-from entities.bullet import Bullet
+import numpy as np
+from core.config import ticks
+from core.scheduler import EventScheduler
+from core.spatial_hash import SpatialIndex
+from entities.bullet import BulletPool
+from mechanics.movement import update_units
+from mechanics.targeting import Targeting
+
+VOLLEY_INTERVAL_TICKS = ticks(0.05)  # ~50 ms between the bullets of a volley
 
 
 class CombatManager:
 
     
-    def __init__(self):
+    def __init__(self, spatial_index=None, observers=None, rng=None, store=None):
         self.difficulty_multiplier = 1.0
-        self.bullets = pygame.sprite.Group()
-        self.scheduled_bullets = []
-
-        # Initialize the mixer if it's not already initialized
-        if not pygame.mixer.get_init():
-            pygame.mixer.init()
-
-        # Load sounds safely
-        self.fire_sound = self.load_sound("assets/sounds/shot.mp3")
-        self.hit_sound = self.load_sound("assets/sounds/hit.mp3")
+        self.spatial_index = spatial_index
+        self.store = store  # UnitStore of the units fought over; taken from the units if not given
+        self.observers = observers if observers is not None else []  # Told about every shot, see Simulation
+        self.bullets = BulletPool(rng=rng)
+        self.tick = 0  # Simulation ticks, advanced once per handle_combat
+        self.scheduled_bullets = EventScheduler()
+        self.volleys = {}  # Unit -> handles of the scheduled bullets it fires or is aimed at
 
         logging.info("CombatManager initialized.")
 
-    def load_sound(self, file_path):
-        """ Load a sound file safely. If it fails, return None. """
-        try:
-            return pygame.mixer.Sound(file_path)
-        except Exception as e:
-            logging.error(f"Error loading sound {file_path}: {e}")
-            return None
-
     def handle_combat(self, units, obstacles, hard_obstacles):
         """ Update unit combat logic and manage bullet spawning. """
         logging.debug("Handling combat...")
+        self.tick += 1
+
+        store = self.store or (units[0].store if units else None)
+        if store is not None:
+            self.cancel_volleys_of_dead(store)  # Units killed outside combat since last tick
+            # Every living unit moves, thinks and fires as one batch over the store's arrays
+            rows = np.array([unit.row for unit in units if unit.health > 0], dtype=np.int64) if self.store is None else store.living_rows()
+            targeting = Targeting(store, rows)
+            update_units(store, rows, targeting, obstacles, hard_obstacles, units)
+
+            ready = rows[store.cooldown[rows] <= 0]
+            targets = targeting.first_in_range(ready)
+            firing = targets >= 0
+            attackers, targets = ready[firing], targets[firing]
+            for attacker, target in zip(attackers.tolist(), targets.tolist()):
+                self.spawn_bullet(store.units[attacker], store.units[target], (), hard_obstacles)
+            store.cooldown[attackers] = store.weapon_column("cooldown_ticks")[attackers]
 
-        teams = {unit.team for unit in units}
-        team_units = {team: [u for u in units if u.team == team] for team in teams}
+        self.update_bullets()  # Process scheduled bullets
+        self.bullets.update(self.spatial_index or self._temporary_index(units, hard_obstacles))
+        if store is not None:
+            self.cancel_volleys_of_dead(store)
 
+    def _temporary_index(self, units, hard_obstacles):
+        """Index built from plain lists, for callers that did not pass one in."""
+        index = SpatialIndex()
         for unit in units:
-            if unit.health <= 0:
-                continue  # Dead units should not act
-
-            logging.debug(f"Processing unit {unit.team.name} at {unit.rect.topleft} (HP: {unit.health})")
-
-            enemies = [e for t, group in team_units.items() if t != unit.team for e in group]
-            unit.update(enemies, obstacles, hard_obstacles, units)
-
-            for enemy in enemies:
-                if enemy.health > 0 and self.is_in_range(unit, enemy) and unit.cooldown_timer <= 0:
-                    self.spawn_bullet(unit, enemy, enemies, hard_obstacles)
-                    unit.cooldown_timer = unit.weapon.fire_rate
-
-        self.update_bullets()  # Process scheduled bullets
-        self.bullets.update()
+            if unit.health > 0:
+                index.units.insert(unit)
+        for obstacle in hard_obstacles:
+            index.hard_obstacles.insert(obstacle)
+        return index
 
     def is_in_range(self, unit, enemy):
         """ Check if the enemy is within the unit's weapon range. """
@@ -59,35 +68,46 @@ class CombatManager:
         return distance <= unit.weapon.range
 
     def spawn_bullet(self, attacker, target, enemies, hard_obstacles):
-        start_time = pygame.time.get_ticks()
         bullets_per_volley = attacker.weapon.bullets_per_volley
-        delay_per_bullet = 50  # 50 ms between each bullet (adjustable)
 
         for i in range(bullets_per_volley):
-            fire_time = start_time + (i * delay_per_bullet)
-            self.scheduled_bullets.append((fire_time, attacker, target, enemies, hard_obstacles))
+            self.schedule_bullet(self.tick + i * VOLLEY_INTERVAL_TICKS, attacker, target)
 
         logging.info(f"{bullets_per_volley} bullets scheduled from {attacker.rect.center} to {target.rect.center}")
 
-    def update_bullets(self):
-        """ Spawn scheduled bullets when their time comes. """
-        current_time = pygame.time.get_ticks()
-        bullets_to_spawn = [b for b in self.scheduled_bullets if current_time >= b[0]]
-
-        for fire_time, attacker, target, enemies, hard_obstacles in bullets_to_spawn:
-            if self.fire_sound:
-                self.fire_sound.play()
+    def schedule_bullet(self, tick, attacker, target):
+        """Queue one bullet of a volley, remembering it under both units so a death can cancel it."""
+        event = self.scheduled_bullets.schedule(tick, (attacker, target))
+        for unit in (attacker, target):
+            handles = self.volleys.get(unit)
+            if handles is None:
+                handles = self.volleys[unit] = []
+            elif not EventScheduler.is_live(handles[0]):
+                handles[:] = [handle for handle in handles if EventScheduler.is_live(handle)]
+            handles.append(event)
+
+    def cancel_volleys_of_dead(self, store):
+        """Cancel every scheduled bullet fired by or aimed at a unit the store has seen die."""
+        for row in store.deaths:
+            for event in self.volleys.pop(store.units[row], ()):
+                self.scheduled_bullets.cancel(event)
+        store.deaths.clear()
+
+    def clear_scheduled_bullets(self):
+        self.scheduled_bullets.clear()
+        self.volleys.clear()
 
-            bullet = Bullet(start_pos=attacker.rect.center, target_unit=target, attacker=attacker, enemies=enemies, hard_obstacles=hard_obstacles, difficulty_modifier=self.difficulty_multiplier)
-            self.bullets.add(bullet)
+    def update_bullets(self):
+        """ Spawn scheduled bullets whose tick has come. """
+        for attacker, target in self.scheduled_bullets.pop_due(self.tick):
+            if attacker.health <= 0 or target.health <= 0:
+                continue  # Killed outside any store this manager drains
 
-            self.scheduled_bullets.remove((fire_time, attacker, target, enemies, hard_obstacles))
+            for observer in self.observers:
+                if hasattr(observer, "on_shot"):
+                    observer.on_shot(attacker, target)
 
-    def render_bullets(self, screen, camera):
-        """ Render bullets on screen. """
-        for bullet in self.bullets:
-            position = camera.apply(bullet.rect.center)
-            pygame.draw.circle(screen, bullet.color, (int(position[0]), int(position[1])), bullet.radius)
+            self.bullets.spawn(attacker.rect.center, attacker, target, difficulty_modifier=self.difficulty_multiplier)
 
     def set_difficulty_multiplier(self, multiplier):
         self.difficulty_multiplier = multiplier
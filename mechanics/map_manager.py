@@ -1,64 +1,110 @@
 import random
+import numpy as np
 from entities.unit import Unit
+from entities.unit_store import UnitStore
 from entities.team import Team
 from entities.obstacle import Obstacle
 from entities import weapon
 from entities.flag import Flag
 from entities.obstacle import HardObstacle
+from core.grid import OccupancyGrid, STATIC_BLOCKED
+from core.navigation import Navigator
+from core.spatial_hash import SpatialIndex
+from core.tile_map import TileMap, TileObstacles, GROUND, OBSTACLE, HARD_OBSTACLE
 class MapManager:
-    def __init__(self, map_file, tile_size=50):
+    def __init__(self, map_file, tile_size=50, weapons=None, rng=None):
         self.map_file = map_file
         self.tile_size = tile_size
+        self.rng = rng or random.Random()
         
         self._hard_obstacles = []
         self._obstacles = []
         self._units = []
         self._teams = []
         self._flags = []  # New list to store flags
+        self._grid = None
+        self._navigator = None
+        self._spatial_index = SpatialIndex()
+        self._unit_store = UnitStore(tile_size=tile_size)  # Every unit's state, one row each in map order
 
-        self.map_data = self._load_map(map_file)
-        if not self.map_data:
-            raise ValueError("Map file is empty or invalid!")
-        
-        self.map_width = len(self.map_data[0])
-        self.map_height = len(self.map_data)
+        self.tile_map = self._load_map(map_file)
+        self.map_width = self.tile_map.width
+        self.map_height = self.tile_map.height
 
-        self.available_weapons = [weapon.SubmachineGun(), weapon.Pistol(), weapon.MachineGun()]
+        # Units draw from these shared instances; pass weapons to try other stats
+        self.available_weapons = weapons if weapons is not None else [weapon.SubmachineGun(), weapon.Pistol(), weapon.MachineGun()]
 
     def _load_map(self, map_file):
-        """Load raw map data from the file."""
-        with open(map_file, 'r') as file:
-            lines = [line.strip() for line in file if line.strip()]
-        return lines
+        """Open the map: a compiled .bmap is memory-mapped, a text map is parsed."""
+        return TileMap.load(map_file)
 
     def load_map(self):
-        """Parse self.map_data and create obstacles/units/flags."""
+        """Build the grid from the tile layer and create units/flags from the spawn table."""
         ally_team = Team("Allies", (0, 255, 0))
         enemy_team = Team("Enemies", (255, 0, 0))
         self._teams.extend([ally_team, enemy_team])
+        cells = bytearray(self.tile_map.blocked().astype(np.uint8) * STATIC_BLOCKED)
+        self._grid = OccupancyGrid(self.map_width, self.map_height, self.tile_size, cells)
+        self._navigator = Navigator(self._grid)
+
+        # Obstacles stay in the tile layer; these only make objects for the tiles something asks about
+        self._obstacles = TileObstacles(self.tile_map, OBSTACLE, Obstacle, self.tile_size)
+        self._hard_obstacles = TileObstacles(self.tile_map, HARD_OBSTACLE, HardObstacle, self.tile_size)
+        self._spatial_index.obstacles = self._obstacles
+        self._spatial_index.hard_obstacles = self._hard_obstacles
+
+        for kind, x, y in self.tile_map.spawns.tolist():
+            position = (x * self.tile_size, y * self.tile_size)
+            if kind == b"U":
+                weapon = self.rng.choice(self.available_weapons)
+                unit = Unit(position[0], position[1], ally_team, health=100, weapon=weapon, navigator=self._navigator, spatial_index=self._spatial_index, store=self._unit_store)
+                ally_team.add_unit(unit)
+                self._units.append(unit)
+            elif kind == b"E":
+                weapon = self.rng.choice(self.available_weapons)
+                unit = Unit(position[0], position[1], enemy_team, health=100, weapon=weapon, navigator=self._navigator, spatial_index=self._spatial_index, store=self._unit_store)
+                enemy_team.add_unit(unit)
+                self._units.append(unit)
+            elif kind == b"F":
+                flag = Flag(position)
+                self._flags.append(flag)
+                print(f"Flag created at {position}")  # Debugging print statement
+
+        self._navigator.build_hierarchy()
+
+    def set_tile(self, tile, code):
+        """Change static terrain on a tile: the tile layer, the grid and its navigation data, and the obstacle views.
+
+        Returns False if the tile is off the map or already has that code.
+        """
+        x, y = tile
+        if not (0 <= x < self.map_width and 0 <= y < self.map_height) or self.tile_map.tiles[y, x] == code:
+            return False
+        self.tile_map.set_tile(tile, code)
+        self._navigator.set_blocked(tile, code != GROUND)
+        self._obstacles.tile_changed(tile)
+        self._hard_obstacles.tile_changed(tile)
+        return True
+
+    def get_tile_map(self):
+        """Return the map's tile layer and spawn table."""
+        return self.tile_map
+
+    def get_grid(self):
+        """Return the shared walkability grid built by load_map."""
+        return self._grid
+
+    def get_navigator(self):
+        """Return the pathfinding entry point for this map."""
+        return self._navigator
+
+    def get_unit_store(self):
+        """Return the UnitStore holding every unit's state."""
+        return self._unit_store
 
-        for y, line in enumerate(self.map_data):
-            for x, char in enumerate(line):
-                position = (x * self.tile_size, y * self.tile_size)
-
-                if char == "#":
-                    self._obstacles.append(Obstacle(position))
-                elif char == "U":
-                    weapon = random.choice(self.available_weapons)
-                    unit = Unit(position[0], position[1], ally_team, health=100, weapon=weapon)
-                    ally_team.add_unit(unit)
-                    self._units.append(unit)
-                elif char == "E":
-                    weapon = random.choice(self.available_weapons)
-                    unit = Unit(position[0], position[1], enemy_team, health=100, weapon=weapon)
-                    enemy_team.add_unit(unit)
-                    self._units.append(unit)
-                elif char == "F":  # New condition to parse flags
-                    flag = Flag(position)
-                    self._flags.append(flag)
-                    print(f"Flag created at {position}")  # Debugging print statement
-                elif char == "X":
-                    self._hard_obstacles.append(HardObstacle(position))
+    def get_spatial_index(self):
+        """Return the spatial hashes for units and obstacles."""
+        return self._spatial_index
 
     def get_map_dimensions(self):
         return self.map_width, self.map_height
@@ -0,0 +1,157 @@
+import numpy as np
+import pygame
+from core import utils
+from core.config import ROTATION_STEPS
+
+
+def move_units(store, rows):
+    """Walk each row one step towards its current waypoint.
+
+    Units closer to the waypoint than their speed land on it and load the
+    next one; the rest move speed pixels along the way and face that way.
+    """
+    rows = rows[store.moving[rows]]
+    if not len(rows):
+        return
+    position = store.position[rows]
+    delta = store.waypoint[rows] - position
+    distance = np.sqrt(delta[:, 0] * delta[:, 0] + delta[:, 1] * delta[:, 1])
+    speed = store.speed[rows]
+    arrived = distance < speed
+    walking = ~arrived & (distance > 0)
+
+    step = delta[walking] / distance[walking, None] * speed[walking, None]
+    position[arrived] = store.waypoint[rows[arrived]]
+    position[walking] += step
+    store.position[rows] = position
+    store.velocity[rows[walking]] = step
+    store.rect[rows, :2] = np.rint(position)
+
+    for row in rows[arrived]:
+        store.advance(row)
+    sync_tiles(store, rows)
+
+
+def sync_tiles(store, rows):
+    """Move grid occupancy for rows whose rect center crossed into another tile."""
+    tiles = store.tile[rows]
+    new = store.centers(rows) // store.tile_size
+    changed = (tiles[:, 0] >= 0) & np.any(new != tiles, axis=1)
+    if not changed.any():
+        return
+    rows, tiles, new = rows[changed], tiles[changed], new[changed]
+    for row, old, tile in zip(rows.tolist(), tiles.tolist(), new.tolist()):
+        store.units[row].grid.move_unit(tuple(old), tuple(tile))
+    store.tile[rows] = new
+
+
+def update_headings(store, rows):
+    """Quantize each row's facing to ROTATION_STEPS; rects take the turned sprite's size."""
+    velocity = store.velocity[rows]
+    angle = np.degrees(np.arctan2(velocity[:, 1], velocity[:, 0])) - 90
+    angle[velocity[:, 1] > 0] += 180
+    heading = np.rint(angle * ROTATION_STEPS / 360).astype(np.int64) % ROTATION_STEPS
+    changed = heading != store.heading[rows]
+    if not changed.any():
+        return
+    rows, heading = rows[changed], heading[changed]
+    # Resize around the center, as assigning pygame.Rect.center would
+    center = store.centers(rows)
+    size = store.facing_sizes()[heading]
+    store.rect[rows, :2] = center - size // 2
+    store.rect[rows, 2:] = size
+    store.heading[rows] = heading
+
+
+def check_cover(store, rows, obstacles):
+    for row in rows:
+        store.units[row].check_cover(obstacles)
+
+
+def pursue(store, rows, targeting, obstacles, hard_obstacles, units):
+    """AI for units without orders: close in on the nearest enemy until it is in range.
+
+    Each unit looks again every search_cooldown ticks; one already within 90%
+    of its weapon's range stays put and keeps looking every tick.
+    """
+    waiting = store.search_timer[rows] > 0
+    store.search_timer[rows[waiting]] -= 1
+    rows = rows[~waiting]
+    if not len(rows):
+        return
+    enemies, distances = targeting.nearest(rows)
+    ranges = store.weapon_column("range")[rows]
+    chasing = (enemies >= 0) & (distances > ranges * 0.9)
+    if not chasing.any():
+        return
+
+    rows, enemies, distances, ranges = rows[chasing], enemies[chasing], distances[chasing], ranges[chasing]
+    for row, enemy_center, start, distance, weapon_range in zip(
+            rows.tolist(), store.centers(enemies).tolist(), store.centers(rows).tolist(), distances.tolist(), ranges.tolist()):
+        unit = store.units[row]
+        position = pygame.math.Vector2(store.position[row].tolist())
+        direction_to_enemy = pygame.math.Vector2(enemy_center) - position
+        if direction_to_enemy.length_squared():
+            direction_to_enemy.normalize_ip()
+
+        if unit.navigator:
+            # Units chasing the same area share one flow field instead of each running A*
+            path = unit.navigator.find_pursuit_path(tuple(start), tuple(enemy_center))
+        else:
+            stop_position = position + direction_to_enemy * (distance - weapon_range + 5)  # Stop just before range
+            path = utils.astar_pathfinding(
+                start=tuple(start),
+                end=stop_position,
+                obstacles=obstacles,
+                hard_obstacles=hard_obstacles,
+                units=units,
+                tile_size=unit.tile_size,
+                map_width=unit.tile_size * 20,
+                map_height=unit.tile_size * 20
+            )
+
+        if not path:
+            position += direction_to_enemy * store.speed[row]
+            store.position[row] = position
+            store.rect[row, :2] = (round(position.x), round(position.y))
+            sync_tiles(store, np.array([row]))
+        else:
+            unit.set_path(path)
+        store.search_timer[row] = store.search_cooldown[row]
+
+
+def update_units(store, rows, targeting, obstacles, hard_obstacles, units):
+    """One tick of movement, cover and AI for rows, all living units of store.
+
+    Selected units follow their orders at double pace and look for cover;
+    the rest pursue. Then everyone walks, turns and is re-filed in the
+    spatial index if its rect crossed a cell.
+    """
+    before = store.rect[rows]
+    cooling = store.cooldown[rows] > 0
+    store.cooldown[rows[cooling]] -= 1
+
+    selected = store.selected[rows]
+    if selected.any():
+        chosen = rows[selected]
+        move_units(store, chosen)
+        check_cover(store, chosen, obstacles)
+    pursue(store, rows[~selected], targeting, obstacles, hard_obstacles, units)
+    move_units(store, rows)
+    update_headings(store, rows)
+    reindex(store, rows, before)
+
+
+def reindex(store, rows, before):
+    """Re-file rows in the spatial index whose rect moved into other cells since before."""
+    if not len(rows):
+        return
+    spatial_index = store.units[rows[0]].spatial_index
+    if not spatial_index:
+        return
+    size = spatial_index.units.cell_size
+    after = store.rect[rows]
+    old = np.concatenate((before[:, :2] // size, (before[:, :2] + before[:, 2:] - 1) // size), axis=1)
+    new = np.concatenate((after[:, :2] // size, (after[:, :2] + after[:, 2:] - 1) // size), axis=1)
+    for row in rows[np.any(old != new, axis=1) & store.alive[rows]]:
+        spatial_index.units.update(store.units[row])
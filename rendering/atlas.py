@@ -0,0 +1,49 @@
+import pygame
+from core.config import ATLAS_SIZE
+
+
+class TextureAtlas:
+    """Packs many small surfaces into one, handed out as (atlas, area rect).
+
+    Surfaces are placed on shelves left to right as they are first asked
+    for. When the atlas is full, region() falls back to the surface itself
+    with no area, so callers never have to special-case a miss.
+    """
+
+    def __init__(self, size=ATLAS_SIZE):
+        self.surface = pygame.Surface((size, size), pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+        self.size = size
+        self.regions = {}  # Surface -> area Rect inside the atlas
+        self.shelf_x = 0
+        self.shelf_y = 0
+        self.shelf_height = 0
+
+    def add(self, source):
+        """Copy source into the atlas; returns its area, or None if it does not fit."""
+        area = self.regions.get(source)
+        if area is not None:
+            return area
+        width, height = source.get_size()
+        if self.shelf_x + width > self.size:
+            self.shelf_x, self.shelf_y = 0, self.shelf_y + self.shelf_height
+            self.shelf_height = 0
+        if width > self.size or self.shelf_y + height > self.size:
+            return None
+        area = pygame.Rect(self.shelf_x, self.shelf_y, width, height)
+        # Adding onto the cleared atlas copies pixels and alpha exactly, unlike an alpha blend
+        self.surface.blit(source, area, special_flags=pygame.BLEND_RGBA_ADD)
+        self.regions[source] = area
+        self.shelf_x += width
+        self.shelf_height = max(self.shelf_height, height)
+        return area
+
+    def region(self, source):
+        """(surface, area) to blit for source: its spot in the atlas, or source itself."""
+        area = self.regions.get(source)
+        if area is None:
+            area = self.add(source)
+            if area is None:
+                return source, None
+        return self.surface, area
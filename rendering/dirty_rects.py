@@ -0,0 +1,56 @@
+MAX_DIRTY_RECTS = 64  # Beyond this a full redraw is cheaper than patching
+
+
+class DirtyRects:
+    """Works out which parts of the screen changed since the last frame.
+
+    Each frame the caller reports every drawable as key -> (screen rect, state),
+    where state is anything that changes its look without moving it. Drawables
+    that moved, changed state, appeared or vanished dirty both their old and
+    new rect. A moved camera or invalidate() asks for a full redraw instead.
+    """
+
+    def __init__(self):
+        self.previous = {}
+        self.camera_position = None
+        self.full = True
+
+    def invalidate(self):
+        self.full = True
+
+    def frame(self, camera, current):
+        """Rects to redraw this frame, or None when the whole screen must be redrawn."""
+        position = (camera.x, camera.y)
+        rects = None
+        if not self.full and position == self.camera_position:
+            rects = []
+            previous = self.previous
+            for key, entry in current.items():
+                old = previous.get(key)
+                if old != entry:
+                    if old is not None:
+                        rects.append(old[0])
+                    rects.append(entry[0])
+            for key in previous.keys() - current.keys():
+                rects.append(previous[key][0])
+            rects = merge_rects(rects)
+            if len(rects) > MAX_DIRTY_RECTS:
+                rects = None
+
+        self.previous = current
+        self.camera_position = position
+        self.full = False
+        return rects
+
+
+def merge_rects(rects):
+    """Union overlapping rects until none overlap, so no area is drawn twice."""
+    merged = []
+    for rect in rects:
+        rect = rect.copy()
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
@@ -1,86 +1,200 @@
+import numpy as np
 import pygame
+from core.assets import assets
+from core.config import CULL_MARGIN
+from core.tile_map import OBSTACLE, HARD_OBSTACLE
+from rendering.sprite_batch import SpriteBatch
+from rendering.static_layer import StaticLayer
 
 class Renderer:
-    def __init__(self, screen, tile_size, camera):
+    def __init__(self, screen, tile_size, camera, spatial_index=None):
         self.screen = screen
         self.tile_size = tile_size
         self.camera = camera
-        self.obstacle_sprite = pygame.image.load('assets/sprites/obstacle.png')
-        self.hard_obstacle_sprite = pygame.image.load('assets/sprites/hard_obstacle.png')
-        self.obstacle_sprite = pygame.transform.scale(self.obstacle_sprite, (tile_size, tile_size))
-        self.hard_obstacle_sprite = pygame.transform.scale(self.hard_obstacle_sprite, (tile_size, tile_size))
-
-    def render_map(self, obstacles, hard_obstacles, colors):
-        for obstacle in obstacles:
-            position = self.camera.apply(obstacle.position)
-            self.screen.blit(self.obstacle_sprite, position)
-        for hard_obstacle in hard_obstacles:
-            position = self.camera.apply(hard_obstacle.position)
-            self.screen.blit(self.hard_obstacle_sprite, position)
+        self.spatial_index = spatial_index
+        self.stats = {}  # Kind -> (drawn, culled) for the last frame
+        self.alpha = 1.0  # How far between the last two simulation ticks to draw moving things
+        self.batch = SpriteBatch()
+        self.health_bars = None
+        self.selection_ring = None
+        self.obstacle_sprite = assets.image('assets/sprites/obstacle.png', (tile_size, tile_size))
+        self.hard_obstacle_sprite = assets.image('assets/sprites/hard_obstacle.png', (tile_size, tile_size))
+        self.static_layer = None
+
+    def build_static_layer(self, tile_map, colors):
+        """Bake ground and obstacles from tile_map's layer into chunks; call again for a different map."""
+        if self.static_layer is None:
+            self.static_layer = StaticLayer(self.tile_size, colors["gray"])
+        self.static_layer.set_tiles(tile_map.tiles, {
+            OBSTACLE: self.obstacle_sprite,
+            HARD_OBSTACLE: self.hard_obstacle_sprite,
+        })
+
+    def terrain_changed(self, tile_map, rect):
+        """Re-bake only the chunks under a world rect whose tiles changed."""
+        if self.static_layer is not None:
+            self.static_layer.tiles = tile_map.tiles  # The first change swaps a memory-mapped layer for a copy
+            self.static_layer.invalidate(rect)
+
+    def render_map(self, tile_map, colors):
+        """Draw ground and obstacles from the pre-baked chunks under the camera."""
+        if self.static_layer is None:
+            self.build_static_layer(tile_map, colors)
+        self.static_layer.draw(self.screen, self.camera)
             
-    def render_bullets(self, combat_manager):
-        """Render all bullets managed by the CombatManager."""
-        combat_manager.render_bullets(self.screen, self.camera)
-
-    def render_units(self, units, colors):
-        for unit in units:
-            position = self.camera.apply(unit.position)
-            self.screen.blit(unit.image, position)
-
-            # # Draw the unit as a circle
-            unit_center = (position[0] + self.tile_size // 2, position[1] + self.tile_size // 2)
-            unit_radius = self.tile_size // 3
-            # pygame.draw.circle(
-            #     self.screen,
-            #     unit.team.color,
-            #     unit_center,
-            #     unit_radius
-            # )
-
-            # Health bar
-            health_bar_length = self.tile_size // 2
-            health_ratio = max(unit.health / 100, 0)
-            pygame.draw.rect(
-                self.screen,
-                colors["red"],
-                (position[0] + 10, position[1], health_bar_length, 5)
-            )
-            pygame.draw.rect(
-                self.screen,
-                colors["green"],
-                (position[0] + 10, position[1], int(health_bar_length * health_ratio), 5)
-            )
-
-            # Render the weapon at the bottom of the unit sprite and smaller than the unit
-            if unit.weapon and unit.weapon.sprite:
-                # Load the weapon sprite
-                weapon_sprite = pygame.image.load(unit.weapon.sprite)
-                # Scale it down (for example, to half the tile size)
-                weapon_size = self.tile_size // 2
-                weapon_sprite = pygame.transform.scale(weapon_sprite, (weapon_size, weapon_size))
-                # Calculate the bottom of the unit's sprite (the circle)
-                bottom_of_unit = unit_center[1] + unit_radius
-                # Center the weapon horizontally with the unit
-                weapon_x = unit_center[0] - weapon_size // 2
-                # Position the weapon so that its top is aligned with the bottom of the unit
-                weapon_y = bottom_of_unit
-                self.screen.blit(weapon_sprite, (weapon_x, weapon_y))
-
-    def render_ground(self, screen_width, screen_height, colors):
-        """Render the ground layer as a grid with the camera's offset."""
-        start_x = -(self.camera.x % self.tile_size)  
-        start_y = -(self.camera.y % self.tile_size)
-        for y in range(start_y, screen_height, self.tile_size):
-            for x in range(start_x, screen_width, self.tile_size):
-                world_x = x + self.camera.x
-                world_y = y + self.camera.y
-                pygame.draw.rect(
-                    self.screen,
-                    colors["gray"],
-                    (x, y, self.tile_size, self.tile_size)
-                )
-
-    def render_flags(self, flags):
-        """Render flags on the map."""
+    def _view(self, area=None):
+        """World rect to draw: the camera view, or a world area within it, plus the cull margin."""
+        if area is None:
+            return self.camera.view_rect(CULL_MARGIN)
+        return area.inflate(2 * CULL_MARGIN, 2 * CULL_MARGIN)
+
+    def render_bullets(self, combat_manager, area=None):
+        """Render the CombatManager's bullets that are on screen (or inside a world area)."""
+        bullets = combat_manager.bullets
+        color, radius = bullets.color, bullets.radius
+        positions = bullets.active_positions(self.alpha)
+        total = len(positions)
+        view = self._view(area)
+        x, y = positions[:, 0], positions[:, 1]
+        positions = positions[(x >= view.left) & (x < view.right) & (y >= view.top) & (y < view.bottom)]
+        for x, y in positions:
+            position = self.camera.apply((round(x), round(y)))
+            pygame.draw.circle(self.screen, color, (int(position[0]), int(position[1])), radius)
+        self.stats["bullets"] = (len(positions), total - len(positions))
+
+    def draw_position(self, unit):
+        """Where to draw unit this frame: alpha of the way from its previous tick's position."""
+        if self.alpha >= 1.0:
+            return unit.position
+        return unit.previous_position.lerp(unit.position, self.alpha)
+
+    def unit_image(self, unit):
+        """The unit's team sprite turned to its heading."""
+        if unit.heading is None:
+            return assets.get(unit.sprite)
+        return assets.rotations(unit.sprite)[unit.heading]
+
+    def visible_units(self, units, area=None):
+        """Units overlapping the view, looked up in the spatial index when there is one."""
+        view = self._view(area)
+        if self.spatial_index:
+            return self.spatial_index.units.query_rect(view)
+        return [unit for unit in units if unit.rect.colliderect(view)]
+
+    def unit_screen_rect(self, unit):
+        """Screen area a unit's sprite, health bar and weapon cover."""
+        x, y = self.camera.apply(self.draw_position(unit))
+        width, height = unit.rect.size if unit.heading is not None else (self.tile_size, self.tile_size)
+        weapon_size = self.tile_size // 2
+        weapon_bottom = self.tile_size // 2 + self.tile_size // 3 + weapon_size
+        # One pixel of slack each side: fractional positions are truncated when drawn
+        return pygame.Rect(int(x) - 1, int(y) - 1, max(width, self.tile_size) + 2, max(height, weapon_bottom) + 2)
+
+    def scene_rects(self, units, combat_manager, flags):
+        """Screen rect and look of every drawn entity, keyed for DirtyRects."""
+        rects = {}
+        view = self.camera.view_rect(CULL_MARGIN)
+        for unit in self.visible_units(units):
+            rects[unit] = (self.unit_screen_rect(unit), (unit.heading, unit.health))
+        radius = combat_manager.bullets.radius
+        for i, (x, y) in enumerate(combat_manager.bullets.active_positions(self.alpha)):
+            if view.collidepoint(x, y):
+                sx, sy = self.camera.apply((round(x), round(y)))
+                rects[("bullet", i)] = (pygame.Rect(int(sx) - radius, int(sy) - radius, 2 * radius + 1, 2 * radius + 1), None)
         for flag in flags:
-            flag.render(self.screen, self.camera)
\ No newline at end of file
+            if flag.rect.colliderect(view):
+                image = assets.get(flag.sprite)
+                rects[flag] = (image.get_rect(topleft=self.camera.apply(flag.rect.topleft)), flag.sprite)
+        return rects
+
+    def _health_bars(self, colors):
+        """Atlas regions of the red and green health bar strips."""
+        if self.health_bars is None:
+            bars = []
+            for color in (colors["red"], colors["green"]):
+                strip = pygame.Surface((self.tile_size // 2, 5))
+                strip.fill(color)
+                bars.append(self.batch.atlas.region(strip))
+            self.health_bars = bars
+        return self.health_bars
+
+    def _selection_ring(self, colors):
+        """Atlas region of the ring drawn around selected units.
+
+        Selection is an overlay: the team frames come from the shared asset
+        cache, so painting on them would recolor every unit using them.
+        """
+        if self.selection_ring is None:
+            ring = pygame.Surface((self.tile_size, self.tile_size), pygame.SRCALPHA)
+            pygame.draw.circle(ring, colors["cyan"], (self.tile_size // 2, self.tile_size // 2), self.tile_size // 2, 2)
+            self.selection_ring = self.batch.atlas.region(ring)
+        return self.selection_ring
+
+    def render_units(self, units, colors, area=None):
+        visible = self.visible_units(units, area)
+        self.stats["units"] = (len(visible), max(len(units) - len(visible), 0))
+        batch = self.batch
+        append, sources, lookup = batch.draws.append, batch.sources, batch.lookup
+        (red, red_area), (green, green_area) = self._health_bars(colors)
+        bar_length, bar_x, bar_y = green_area.width, green_area.x, green_area.y
+        camera_x, camera_y = self.camera.x, self.camera.y
+        alpha = self.alpha
+
+        # The weapon sits centered under the unit, its top at the bottom of the unit's circle
+        weapon_size = self.tile_size // 2
+        weapon_dx = self.tile_size // 2 - weapon_size // 2
+        weapon_dy = self.tile_size // 2 + self.tile_size // 3
+
+        # Positions, facings and health bars come from the unit store's arrays for all visible units at once
+        if not visible:
+            return
+        store = visible[0].store
+        rows = np.fromiter((unit.row for unit in visible), dtype=np.int64, count=len(visible))
+        position = store.position[rows]
+        if alpha < 1.0:
+            previous = store.previous[rows]
+            position = previous + (position - previous) * alpha
+        xs = (position[:, 0] - camera_x).tolist()
+        ys = (position[:, 1] - camera_y).tolist()
+        headings = store.heading[rows].tolist()
+        health = store.health[rows]
+        selected = store.selected[rows].tolist()
+        widths = np.where(health >= 100, bar_length, np.where(health > 0, (bar_length * (health / 100)).astype(np.int64), 0)).tolist()
+
+        weapons = {}  # Weapon sprite file -> (source, area), resolved once per frame
+        frames = {}   # Team sprite -> its rotations, looked up once per frame
+        for unit, x, y, heading, width, is_selected in zip(visible, xs, ys, headings, widths, selected):
+            rotations = frames.get(unit.sprite)
+            if rotations is None:
+                rotations = frames[unit.sprite] = assets.rotations(unit.sprite)
+            image = rotations[heading] if heading >= 0 else assets.get(unit.sprite)
+            source, sprite_area = sources.get(image) or lookup(image)
+            append((source, (x, y), sprite_area))
+            if is_selected:
+                # Ring centered on the frame, whatever size the rotation gave it
+                ring, ring_area = self._selection_ring(colors)
+                offset_x = (image.get_width() - self.tile_size) // 2
+                offset_y = (image.get_height() - self.tile_size) // 2
+                append((ring, (x + offset_x, y + offset_y), ring_area))
+
+            # Health bar: the full red strip, then as much of the green one as health remains
+            append((red, (x + 10, y), red_area))
+            append((green, (x + 10, y), (bar_x, bar_y, width, 5)))
+
+            weapon = unit.weapon
+            if weapon and weapon.sprite:
+                entry = weapons.get(weapon.sprite)
+                if entry is None:
+                    entry = weapons[weapon.sprite] = lookup(assets.image(weapon.sprite, (weapon_size, weapon_size)))
+                append((entry[0], (x + weapon_dx, y + weapon_dy), entry[1]))
+        batch.flush(self.screen)
+
+    def render_flags(self, flags, area=None):
+        """Render flags on the map."""
+        view = self._view(area)
+        visible = [flag for flag in flags if flag.rect.colliderect(view)]
+        self.stats["flags"] = (len(visible), len(flags) - len(visible))
+        camera_x, camera_y = self.camera.x, self.camera.y
+        for flag in visible:
+            self.batch.add(assets.get(flag.sprite), (flag.rect.x - camera_x, flag.rect.y - camera_y))
+        self.batch.flush(self.screen)
\ No newline at end of file
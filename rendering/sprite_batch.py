@@ -0,0 +1,35 @@
+from rendering.atlas import TextureAtlas
+
+
+class SpriteBatch:
+    """Collects a frame's sprite draws and submits them in one Surface.blits call.
+
+    Sprites are looked up in a shared texture atlas, so most entries blit
+    from the same source surface with an area rect. Draw order is the order
+    of add() calls.
+    """
+
+    def __init__(self, atlas=None):
+        self.atlas = atlas or TextureAtlas()
+        self.draws = []    # (source, dest, area)
+        self.sources = {}  # Sprite -> (source, area) to blit it from
+
+    def __len__(self):
+        return len(self.draws)
+
+    def lookup(self, sprite):
+        """(source, area) to blit sprite from, resolved through the atlas once per sprite."""
+        entry = self.sources.get(sprite)
+        if entry is None:
+            entry = self.sources[sprite] = self.atlas.region(sprite)
+        return entry
+
+    def add(self, sprite, dest):
+        source, area = self.sources.get(sprite) or self.lookup(sprite)
+        self.draws.append((source, dest, area))
+
+    def flush(self, screen):
+        """Draw everything queued, in order, and start a new batch."""
+        if self.draws:
+            screen.blits(self.draws, doreturn=False)
+            self.draws = []
@@ -0,0 +1,72 @@
+import numpy as np
+import pygame
+from core.config import STATIC_CHUNK_TILES
+
+
+class StaticLayer:
+    """Ground and obstacles pre-drawn onto chunk surfaces.
+
+    The map is split into square chunks of STATIC_CHUNK_TILES tiles. A chunk
+    is baked the first time it comes into view and kept until invalidate()
+    marks it dirty, so a frame costs one blit per visible chunk however big
+    the map is.
+    """
+
+    def __init__(self, tile_size, ground_color, chunk_tiles=STATIC_CHUNK_TILES):
+        self.tile_size = tile_size
+        self.ground_color = ground_color
+        self.chunk_size = chunk_tiles * tile_size
+        self.tiles = None  # (height, width) tile codes, e.g. a TileMap's layer
+        self.sprites = {}  # Tile code -> surface drawn on those tiles
+        self.chunks = {}   # (cx, cy) -> baked Surface
+        self.bakes = 0
+
+    def set_tiles(self, tiles, sprites):
+        """Replace what is drawn: tiles is a (height, width) tile layer, sprites maps tile codes to images."""
+        self.tiles = tiles
+        self.sprites = sprites
+        self.chunks.clear()
+
+    def invalidate(self, rect):
+        """Drop the baked chunks overlapping a world rect so they are redrawn."""
+        size = self.chunk_size
+        for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+                self.chunks.pop((cx, cy), None)
+
+    def _bake(self, cx, cy):
+        size = self.chunk_size
+        area = pygame.Rect(cx * size, cy * size, size, size)
+        surface = pygame.Surface((size, size))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.fill(self.ground_color)
+        if self.tiles is not None:
+            # Only this chunk's slice of the tile layer is looked at
+            tile_size = self.tile_size
+            span = size // tile_size
+            tx, ty = cx * span, cy * span
+            x0, y0 = max(tx, 0), max(ty, 0)
+            chunk = self.tiles[y0:max(ty + span, 0), x0:max(tx + span, 0)]
+            for code, sprite in self.sprites.items():
+                ys, xs = np.nonzero(chunk == code)
+                for x, y in zip((xs + x0 - tx).tolist(), (ys + y0 - ty).tolist()):
+                    surface.blit(sprite, (x * tile_size, y * tile_size))
+        self.chunks[(cx, cy)] = surface
+        self.bakes += 1
+        return surface
+
+    def draw(self, screen, camera):
+        """Blit the chunks overlapping the camera view; returns how many were drawn."""
+        size = self.chunk_size
+        width, height = screen.get_size()
+        drawn = 0
+        x, y = int(camera.x), int(camera.y)
+        for cy in range(y // size, (y + height - 1) // size + 1):
+            for cx in range(x // size, (x + width - 1) // size + 1):
+                surface = self.chunks.get((cx, cy))
+                if surface is None:
+                    surface = self._bake(cx, cy)
+                screen.blit(surface, camera.apply((cx * size, cy * size)))
+                drawn += 1
+        return drawn
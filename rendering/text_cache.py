@@ -0,0 +1,49 @@
+from collections import OrderedDict
+import pygame
+from core.config import TEXT_CACHE_SIZE
+
+
+class TextCache:
+    """Fonts kept by (face, size) and rendered text surfaces kept in an LRU.
+
+    Rendered surfaces are shared between callers, so they must not be drawn on.
+    """
+
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.fonts = {}               # (face, size) -> Font
+        self.surfaces = OrderedDict()  # (text, color, size, face, antialias) -> Surface
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, size, face=None):
+        key = (face, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.Font(face, size)
+        return font
+
+    def render(self, text, size, color, face=None, antialias=True):
+        """Surface with text drawn in color, rendered once per distinct (text, color, size)."""
+        key = (text, tuple(color), size, face, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.font(size, face).render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def size(self, text, size, face=None):
+        """(width, height) text would render at, without rendering it."""
+        return self.font(size, face).size(text)
+
+    def clear(self):
+        self.surfaces.clear()
+
+
+text_cache = TextCache()
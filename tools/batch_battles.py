@@ -0,0 +1,173 @@
+"""Play many headless battles in parallel for weapon balance sweeps.
+
+Every combination of --set values, --difficulty and seed is one match.
+Results are written row by row as matches finish.
+
+Run from the repository root:
+    python -m tools.batch_battles --seeds 0-99 --set Pistol.damage=8,10,12 --out results.csv
+    python -m tools.batch_battles --seeds 0-999 --difficulty 0.5,1,2 --out results.parquet
+"""
+import argparse
+import csv
+import io
+import itertools
+import logging
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from multiprocessing import Pool
+from core.simulation import Simulation
+from entities import weapon
+
+WEAPONS = {"Pistol": weapon.Pistol, "SubmachineGun": weapon.SubmachineGun, "MachineGun": weapon.MachineGun}
+# accuracy_modifier is left out: bullets fire at BULLET_ACCURACY whatever the weapon, so sweeping it changes nothing
+TUNABLE = ("cooldown", "damage", "bullets_per_volley", "range")
+PARQUET_BATCH = 500  # Rows buffered per Parquet row group
+
+
+def parse_seeds(text):
+    """'0-99' or '1,5,9' (or a mix) -> list of ints."""
+    seeds = []
+    for part in text.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            seeds.extend(range(int(first), int(last) + 1))
+        else:
+            seeds.append(int(part))
+    return seeds
+
+
+def parse_setting(text):
+    """'Pistol.damage=8,10' -> ('Pistol.damage', [8, 10])."""
+    key, _, values = text.partition("=")
+    name, _, stat = key.partition(".")
+    if name not in WEAPONS or stat not in TUNABLE:
+        raise argparse.ArgumentTypeError(f"expected <{'|'.join(WEAPONS)}>.<{'|'.join(TUNABLE)}>=v1,v2,... got {text!r}")
+    return key, [float(value) if "." in value else int(value) for value in values.split(",")]
+
+
+def build_weapons(settings):
+    """Weapon instances in the map's usual draw order, with settings applied."""
+    weapons = {"SubmachineGun": weapon.SubmachineGun(), "Pistol": weapon.Pistol(), "MachineGun": weapon.MachineGun()}
+    for key, value in settings.items():
+        name, stat = key.split(".")
+        setattr(weapons[name], stat, value)
+    return list(weapons.values())
+
+
+def _init_worker():
+    # Units and paths print as they go; keep worker output to warnings
+    sys.stdout = open(os.devnull, "w")
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def play_match(job):
+    """Run one battle to its end or the tick cap; returns a result row."""
+    map_file, settings, difficulty, seed, max_ticks = job
+    began = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        simulation = Simulation(map_file, difficulty=difficulty, weapons=build_weapons(settings), seed=seed)
+        state = simulation.run(max_ticks)
+    winner = {"WIN": "Allies", "GAME_OVER": "Enemies"}.get(state, "")
+
+    row = {"seed": seed, "difficulty": difficulty}
+    row.update(settings)
+    row.update({
+        "state": state if state != "GAME" else "TIMEOUT",
+        "winner": winner,
+        "ticks": simulation.tick,
+        "seconds": round(time.perf_counter() - began, 4),
+    })
+    for team in simulation.teams:
+        row[f"survivors_{team.name}"] = sum(1 for unit in simulation.units if unit.team is team)
+    damage = simulation.combat_manager.bullets.damage_by_weapon
+    for instance in build_weapons({}):
+        row[f"damage_{instance.name}"] = round(damage.get(instance.name, 0), 2)
+    simulation.close()
+    return row
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.writer = None
+
+    def write(self, row):
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(row))
+            self.writer.writeheader()
+        self.writer.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    """Writes rows in row groups of PARQUET_BATCH; needs pyarrow."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow); use a .csv path instead.")
+        self.pyarrow = pyarrow
+        self.path = path
+        self.writer = None
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= PARQUET_BATCH:
+            self._flush()
+
+    def _flush(self):
+        if not self.rows:
+            return
+        table = self.pyarrow.Table.from_pylist(self.rows)
+        if self.writer is None:
+            self.writer = self.pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+        self.rows = []
+
+    def close(self):
+        self._flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless battles over a weapon/difficulty grid.")
+    parser.add_argument("--map", default="assets/maps/test_map.txt", help="Map file to play on")
+    parser.add_argument("--seeds", default="0-9", help="Seeds, e.g. 0-99 or 1,2,3")
+    parser.add_argument("--set", dest="settings", type=parse_setting, action="append", default=[],
+                        help="Weapon stat values to sweep, e.g. Pistol.damage=8,10,12 (repeatable)")
+    parser.add_argument("--difficulty", default="1.0", help="Difficulty multipliers, e.g. 0.5,1,2")
+    parser.add_argument("--max-ticks", type=int, default=3000, help="Ticks before a match counts as a timeout")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: one per CPU)")
+    parser.add_argument("--out", default="battles.csv", help="Output file, .csv or .parquet")
+    args = parser.parse_args()
+
+    keys = [key for key, _ in args.settings]
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(values for _, values in args.settings))]
+    difficulties = [float(value) for value in args.difficulty.split(",")]
+    jobs = [(args.map, settings, difficulty, seed, args.max_ticks)
+            for settings in grid for difficulty in difficulties for seed in parse_seeds(args.seeds)]
+
+    sink = ParquetSink(args.out) if args.out.endswith(".parquet") else CsvSink(args.out)
+    began = time.perf_counter()
+    wins = {}
+    with Pool(args.workers, initializer=_init_worker) as pool:
+        for done, row in enumerate(pool.imap_unordered(play_match, jobs, chunksize=4), 1):
+            sink.write(row)
+            wins[row["state"]] = wins.get(row["state"], 0) + 1
+            if done % 100 == 0 or done == len(jobs):
+                print(f"{done}/{len(jobs)} matches, {time.perf_counter() - began:.1f}s, outcomes {wins}")
+    sink.close()
+    print(f"Wrote {len(jobs)} results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Sanity checks for the hierarchical pathfinder; exits non-zero on a failure.
+
+Run from the repository root:
+    python -m tools.check_navigation
+    python -m tools.check_navigation --maps 50 --seed 3
+"""
+import argparse
+import random
+import sys
+from collections import deque
+from core.grid import OccupancyGrid
+from core.hpa import HierarchicalPathfinder
+
+
+def check_start_on_entrance():
+    """A unit standing on a chokepoint entrance must still get a route through it."""
+    grid = OccupancyGrid(8, 4, 50)
+    for y in range(4):
+        if y != 1:
+            grid.set_blocked((4, y))  # Wall between the two clusters, one gap at y=1
+    hierarchy = HierarchicalPathfinder(grid, cluster_size=4)
+    failures = []
+    for start in ((3, 1), (2, 1)):
+        path = hierarchy.abstract_path(start, (6, 2))
+        if not path or path[0] != start or path[-1] != (6, 2):
+            failures.append(f"abstract_path({start}, (6, 2)) returned {path}")
+    return failures
+
+
+def orthogonal_reach(grid, start):
+    """Tiles reachable from start by straight steps only.
+
+    Entrances pair tiles facing each other across a border, so a connection
+    that only exists as a diagonal squeeze past a cluster corner is not
+    modelled; straight-step reachability is what the abstraction promises.
+    """
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        x, y = queue.popleft()
+        for neighbor in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if neighbor not in seen and grid.is_passable(neighbor):
+                seen.add(neighbor)
+                queue.append(neighbor)
+    return seen
+
+
+def check_reachability(maps, rng):
+    """Wherever straight steps connect two tiles, the abstract search must find a path too."""
+    failures = []
+    for _ in range(maps):
+        size = rng.randint(8, 24)
+        grid = OccupancyGrid(size, size, 50)
+        for x in range(size):
+            for y in range(size):
+                if rng.random() < 0.3:
+                    grid.set_blocked((x, y))
+        hierarchy = HierarchicalPathfinder(grid, cluster_size=4)
+        open_tiles = [(x, y) for x in range(size) for y in range(size) if grid.is_passable((x, y))]
+        # Entrance tiles are the interesting starts, so mix them in with random ones
+        starts = [tile for nodes in hierarchy.nodes.values() for tile in nodes] + rng.sample(open_tiles, min(5, len(open_tiles)))
+        for start in rng.sample(starts, min(10, len(starts))):
+            reachable = orthogonal_reach(grid, start)
+            for end in rng.sample(open_tiles, min(5, len(open_tiles))):
+                if end in reachable and not hierarchy.abstract_path(start, end):
+                    failures.append(f"{size}x{size} map: no abstract path {start} -> {end}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the hierarchical pathfinder against plain BFS reachability.")
+    parser.add_argument("--maps", type=int, default=20, help="Random maps for the reachability check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failures = check_start_on_entrance() + check_reachability(args.maps, random.Random(args.seed))
+    for failure in failures:
+        print("FAIL", failure)
+    print(f"{len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compare grid search strategies on generated (or text) maps.
+
+Run from the repository root:
+    python -m tools.compare_pathfinding --size 200 --maps 5 --queries 50
+    python -m tools.compare_pathfinding --map assets/maps/test_map.txt
+"""
+import argparse
+import random
+import time
+from core.grid import OccupancyGrid
+from core.utils import SEARCH_STRATEGIES
+
+TILE_SIZE = 50
+
+
+def generate_map(size, density, rng):
+    """Open map scattered with rectangular blocks covering roughly density of it."""
+    grid = OccupancyGrid(size, size, TILE_SIZE)
+    target = int(size * size * density)
+    blocked = 0
+    while blocked < target:
+        x, y = rng.randrange(size), rng.randrange(size)
+        width, height = rng.randint(1, max(1, size // 10)), rng.randint(1, max(1, size // 10))
+        for ty in range(y, min(size, y + height)):
+            for tx in range(x, min(size, x + width)):
+                if grid.is_passable((tx, ty)):
+                    grid.set_blocked((tx, ty))
+                    blocked += 1
+    return grid
+
+
+def load_text_map(path):
+    with open(path, 'r') as file:
+        lines = [line.strip() for line in file if line.strip()]
+    grid = OccupancyGrid(len(lines[0]), len(lines), TILE_SIZE)
+    for y, line in enumerate(lines):
+        for x, char in enumerate(line):
+            if char in "#X":
+                grid.set_blocked((x, y))
+    return grid
+
+
+def random_free_position(grid, rng):
+    while True:
+        tile = (rng.randrange(grid.width), rng.randrange(grid.height))
+        if grid.is_walkable(tile):
+            return grid.tile_center(tile)
+
+
+def compare(grids, queries, rng):
+    totals = {name: {"expansions": 0, "seconds": 0.0, "steps": 0, "found": 0} for name in SEARCH_STRATEGIES}
+    for grid in grids:
+        for _ in range(queries):
+            start = random_free_position(grid, rng)
+            end = random_free_position(grid, rng)
+            for name, strategy in SEARCH_STRATEGIES.items():
+                began = time.perf_counter()
+                search = strategy(start, end, grid)
+                search.step()
+                totals[name]["seconds"] += time.perf_counter() - began
+                totals[name]["expansions"] += search.expansions
+                totals[name]["steps"] += len(search.path)
+                totals[name]["found"] += bool(search.path)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare A* and Jump Point Search on grid maps.")
+    parser.add_argument("--map", help="Text map to use instead of generated ones")
+    parser.add_argument("--size", type=int, default=128, help="Generated map side in tiles")
+    parser.add_argument("--density", type=float, default=0.2, help="Share of generated tiles that are blocked")
+    parser.add_argument("--maps", type=int, default=3, help="Number of generated maps")
+    parser.add_argument("--queries", type=int, default=30, help="Random queries per map")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.map:
+        grids = [load_text_map(args.map)]
+    else:
+        grids = [generate_map(args.size, args.density, rng) for _ in range(args.maps)]
+
+    totals = compare(grids, args.queries, rng)
+    count = len(grids) * args.queries
+    print(f"{count} queries on {len(grids)} map(s) of {grids[0].width}x{grids[0].height}")
+    print(f"{'strategy':<10}{'found':>8}{'avg expansions':>16}{'avg ms':>10}{'avg steps':>11}")
+    for name, stats in totals.items():
+        print(f"{name:<10}{stats['found']:>8}{stats['expansions'] / count:>16.1f}"
+              f"{stats['seconds'] * 1000 / count:>10.3f}{stats['steps'] / count:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Compile text maps into the binary .bmap format the game memory-maps.
+
+Run from the repository root:
+    python -m tools.compile_map assets/maps/test_map.txt
+    python -m tools.compile_map maps/*.txt --out-dir build/maps
+"""
+import argparse
+import os
+import time
+from core.tile_map import TileMap
+
+
+def compile_map(source, destination):
+    """Parse a text map and write it compiled; returns the TileMap."""
+    with open(source) as file:
+        tile_map = TileMap.from_text(file.read().splitlines())
+    tile_map.save(destination)
+    return tile_map
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert text maps into compiled .bmap files.")
+    parser.add_argument("maps", nargs="+", help="Text map files")
+    parser.add_argument("--out-dir", default=None, help="Where to write the .bmap files (default: next to each map)")
+    args = parser.parse_args()
+
+    for source in args.maps:
+        directory = args.out_dir or os.path.dirname(source)
+        if args.out_dir:
+            os.makedirs(args.out_dir, exist_ok=True)
+        destination = os.path.join(directory, os.path.splitext(os.path.basename(source))[0] + ".bmap")
+        began = time.perf_counter()
+        tile_map = compile_map(source, destination)
+        elapsed = time.perf_counter() - began
+        print(f"{source} -> {destination}: {tile_map.width}x{tile_map.height} tiles, "
+              f"{len(tile_map.spawns)} spawns, {os.path.getsize(destination)} bytes in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Re-simulate a saved replay headless and report where the time went.
+
+Run from the repository root:
+    python -m tools.play_replay replays/20260101-120000-12345.json
+    python -m tools.play_replay replay.json --until 900 --slowest 10
+"""
+import argparse
+import io
+import time
+from contextlib import nullcontext, redirect_stdout
+from core.replay import Replay
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play back a replay at full speed without a window.")
+    parser.add_argument("replay", help="Replay file saved by the game")
+    parser.add_argument("--until", type=int, default=None, help="Stop after this tick (default: the recorded end)")
+    parser.add_argument("--slowest", type=int, default=5, help="How many of the slowest ticks to list")
+    parser.add_argument("--verbose", action="store_true", help="Keep the simulation's own printing")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    print(f"Seed {replay.seed} on {replay.map_file}: {replay.ticks} ticks, {len(replay.commands)} orders")
+
+    timings = []
+    began = time.perf_counter()
+    with nullcontext() if args.verbose else redirect_stdout(io.StringIO()):
+        simulation = replay.play(until_tick=args.until, on_tick=lambda sim, seconds: timings.append((seconds, sim.tick)))
+    elapsed = time.perf_counter() - began
+
+    print(f"Reached tick {simulation.tick} in {elapsed:.2f}s ({simulation.tick / max(elapsed, 1e-9):.0f} ticks/s), state {simulation.state}")
+    for team in simulation.teams:
+        print(f"  {team.name}: {sum(1 for unit in simulation.units if unit.team is team)} units left")
+    if timings and args.slowest:
+        print("Slowest ticks:")
+        for seconds, tick in sorted(timings, reverse=True)[:args.slowest]:
+            print(f"  tick {tick}: {seconds * 1000:.2f} ms")
+    simulation.close()
+
+
+if __name__ == "__main__":
+    main()